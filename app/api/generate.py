@@ -1,27 +1,40 @@
-from typing import Optional
+from contextlib import contextmanager
+from typing import Iterator, Optional
 from fastapi import APIRouter, HTTPException, BackgroundTasks
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+import asyncio
 import io
 import logging
+import threading
+import time
 import uuid
 from datetime import datetime
 
-from app.api.presentation_templates import templates_store
-from app.core.embeddings import document_index
+from app.config import settings
+from app.core.context_packer import context_packer
+from app.core.embeddings import DocumentIndex, index_registry
 from app.core.llm_generator import content_generator
 from app.core.pptx_builder import PresentationBuilder
+from app.core.storage import job_store, templates_store, worker_id
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-generation_status = {}
+# Выставляется при плавной остановке: задачи отдают аренду на границе слайда
+shutdown_event = threading.Event()
 
 
 class GenerationRequest(BaseModel):
     audience: str = "инвесторы"
     presentation_type: str = "standard"
     template_id: Optional[str] = None
+    project_id: str = settings.DEFAULT_PROJECT_ID
+
+
+class SlideRegenerationRequest(BaseModel):
+    audience: Optional[str] = None
+    refresh_context: bool = False
 
 
 class GenerationResponse(BaseModel):
@@ -42,7 +55,24 @@ def _get_slides_structure():
     ]
 
 
-def _search_relevant_context(slide_type: str, title: str) -> str:
+def _project_index(project_id: str) -> DocumentIndex:
+    """Индекс проекта с документами, иначе HTTPException; читает диск - вызывать не из цикла событий.
+
+    Неизвестный проект не создается: ``get`` завел бы каталог под любой присланный id.
+    """
+    try:
+        if not index_registry.exists(project_id):
+            raise HTTPException(status_code=404, detail="Проект не найден")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    document_index = index_registry.get(project_id)
+    if not document_index.documents:
+        raise HTTPException(status_code=400, detail="Сначала загрузите документы")
+    return document_index
+
+
+def _search_relevant_context(document_index: DocumentIndex, slide_type: str, title: str) -> str:
     search_queries = {
         "title": "название проект продукт",
         "problem": "проблема задача вызов",
@@ -54,30 +84,59 @@ def _search_relevant_context(slide_type: str, title: str) -> str:
     }
 
     query = search_queries.get(slide_type, title)
-    results = document_index.search(query, k=2)  # Берем больше результатов
+    chunks = document_index.search_chunks(query, k=settings.CONTEXT_SEARCH_K)
+    chunks = [chunk for chunk in chunks if len(chunk["content"]) > 10]
+
+    # Для финансов и рынка - посчитанные при загрузке показатели из таблиц
+    facts = document_index.table_facts(slide_type)
+
+    # Ранжирование, удаление перекрытий и обрезка по бюджету токенов слайда
+    return context_packer.pack(chunks, slide_type, facts=facts)
 
-    if results:
-        # Объединяем контекст из нескольких результатов
-        context_parts = []
-        for content, content_type, source in results[:2]:
-            if content and len(content) > 10:
-                context_parts.append(content[:150])
 
-        if context_parts:
-            return " | ".join(context_parts)
+@contextmanager
+def _lease_heartbeat(job_id: str) -> Iterator[threading.Event]:
+    """Продлевает аренду задачи каждую треть JOB_LEASE_SECONDS, пока идет генерация.
 
-    return "Проект представляет инновационное решение"
+    Отдает событие, которое выставляется, если задачу забрал другой воркер.
+    """
+    stop, lost = threading.Event(), threading.Event()
+
+    def beat():
+        while not stop.wait(settings.JOB_LEASE_SECONDS / 3):
+            if not job_store.renew_lease(job_id):
+                lost.set()
+                return
+
+    thread = threading.Thread(target=beat, name=f"lease-{job_id[:8]}", daemon=True)
+    thread.start()
+    try:
+        yield lost
+    finally:
+        stop.set()
+        thread.join()
 
 
 def _generate_presentation_task(job_id: str, request: GenerationRequest):
+    """Генерирует презентацию, продолжая с последнего сохраненного слайда.
+
+    Каждый готовый слайд сразу пишется в хранилище, поэтому после падения или
+    перезапуска задача возобновляется без повторной генерации готовых слайдов.
+    """
     try:
-        logger.info(f"🚀 Начата генерация презентации для job {job_id}")
+        done = job_store.get(job_id)["slides_generated"]
+        if done:
+            logger.info(f"🔁 Возобновлена генерация job {job_id}: готово слайдов {len(done)}")
+        else:
+            logger.info(f"🚀 Начата генерация презентации для job {job_id}")
 
-        generation_status[job_id].update({"status": "processing", "progress": 10})
+        if not job_store.update_owned(job_id, status="processing", progress=10):
+            logger.warning(f"Job {job_id} забрал другой воркер, прекращаем")
+            return
 
         # Создаем билдер
-        if request.template_id and request.template_id in templates_store:
-            template_info = templates_store[request.template_id]
+        template_info = templates_store.get(request.template_id) if request.template_id else None
+        if template_info:
             template_path = template_info["file_path"]
             builder = PresentationBuilder(template_path)
             logger.info(f"📁 Используется шаблон: {template_info['name']}")
@@ -85,75 +144,126 @@ def _generate_presentation_task(job_id: str, request: GenerationRequest):
             builder = PresentationBuilder()
             logger.info("📁 Используется стандартный шаблон")
 
+        document_index = index_registry.get(request.project_id)
         slides_structure = _get_slides_structure()
-        generation_status[job_id]["slides_generated"] = []
-
-        # Генерируем каждый слайд
-        for i, slide_spec in enumerate(slides_structure):
-            progress = 10 + int((i / len(slides_structure)) * 80)
-            generation_status[job_id]["progress"] = progress
 
-            slide_type = slide_spec["type"]
-            slide_title = slide_spec["title"]
-            context = _search_relevant_context(slide_type, slide_title)
-
-            logger.info(f"📝 Генерация слайда {i + 1}/{len(slides_structure)}: {slide_title}")
-
-            # Генерируем контент
-            generation_result = content_generator.generate_slide_content(
-                slide_type, context, request.audience
+        # Готовые слайды только переносим в PPTX, без обращения к LLM
+        for slide in done:
+            builder.add_slide(slide["slide_type"], slide["title"], slide["content"])
+
+        # Аренда продлевается в фоне: один слайд может генерироваться дольше JOB_LEASE_SECONDS
+        with _lease_heartbeat(job_id) as lease_lost:
+            # Генерируем каждый слайд
+            for i, slide_spec in enumerate(slides_structure):
+                if i < len(done):
+                    continue
+                if shutdown_event.is_set():
+                    job_store.release_lease(job_id)
+                    logger.info(f"⏸ Остановка сервиса: job {job_id} отдана после {i} слайдов")
+                    return
+                if lease_lost.is_set() or not job_store.renew_lease(job_id):
+                    logger.warning(f"Job {job_id} забрал другой воркер, прекращаем")
+                    return
+
+                progress = 10 + int((i / len(slides_structure)) * 80)
+                job_store.update_owned(job_id, progress=progress)
+
+                slide_type = slide_spec["type"]
+                slide_title = slide_spec["title"]
+                context = _search_relevant_context(document_index, slide_type, slide_title)
+
+                logger.info(f"📝 Генерация слайда {i + 1}/{len(slides_structure)}: {slide_title}")
+
+                # Генерируем контент
+                generation_result = content_generator.generate_slide_content(
+                    slide_type, context, request.audience
+                )
+
+                # Создаем слайд
+                builder.add_slide(slide_type, slide_title, generation_result["content"])
+                logger.info(f"✅ Создан слайд: {slide_title}")
+
+                # Контекст сохраняем, чтобы перегенерация слайда обходилась без поиска
+                # Аренда могла истечь за время генерации слайда - тогда слайд уже пишет новый владелец
+                appended = job_store.append_slide(job_id, {
+                    "slide_type": slide_type,
+                    "title": slide_title,
+                    "content": generation_result["content"],
+                    "context": context,
+                    "status": "success"
+                })
+                if not appended:
+                    logger.warning(f"Job {job_id} забрал другой воркер, слайд {i + 1} не сохранен")
+                    return
+
+            # Сохраняем
+            job_store.update_owned(job_id, progress=95)
+            presentation_bytes = builder.save_to_bytes()
+
+            completed = job_store.update_owned(
+                job_id,
+                status="completed",
+                progress=100,
+                presentation_data=presentation_bytes.getvalue(),
+                slides_count=builder.get_slide_count(),
+                presentation_filename=f"presentation_{job_id[:8]}.pptx"
             )
-
-            # Создаем слайд
-            builder.add_slide(slide_type, slide_title, generation_result["content"])
-            logger.info(f"✅ Создан слайд: {slide_title}")
-
-            generation_status[job_id]["slides_generated"].append({
-                "slide_type": slide_type,
-                "title": slide_title,
-                "content": generation_result["content"],
-                "status": "success"
-            })
-
-        # Сохраняем
-        generation_status[job_id]["progress"] = 95
-        presentation_bytes = builder.save_to_bytes()
-
-        generation_status[job_id].update({
-            "status": "completed",
-            "progress": 100,
-            "presentation_data": presentation_bytes.getvalue(),
-            "slides_count": builder.get_slide_count(),
-            "presentation_filename": f"presentation_{job_id[:8]}.pptx"
-        })
+            if not completed:
+                logger.warning(f"Job {job_id} забрал другой воркер, результат не сохранен")
+                return
 
         logger.info(f"🎉 Презентация успешно сгенерирована! Слайдов: {builder.get_slide_count()}")
 
     except Exception as e:
         logger.error(f"❌ Ошибка генерации: {e}")
-        generation_status[job_id].update({
-            "status": "failed",
-            "error_message": str(e)
-        })
+        job_store.update_owned(job_id, status="failed", error_message=str(e))
+
+
+def resume_orphaned_jobs() -> int:
+    """Забирает незавершенные задачи умерших или остановленных воркеров.
+
+    Каждая задача продолжается в отдельном потоке с последнего готового слайда.
+    Задача, прерванная аварийно JOB_MAX_ATTEMPTS раз, помечается как failed;
+    отдача задачи при плавной остановке попыткой не считается.
+    """
+    resumed = 0
+    for job in job_store.orphaned():
+        if not job_store.claim(job):
+            continue
+
+        job_id = job["job_id"]
+        # Отданная при остановке задача попытку не тратит - перезапуски воркеров ее не убивают
+        if job_store.interrupted(job) and job["attempts"] + 1 > settings.JOB_MAX_ATTEMPTS:
+            job_store.update(job_id, status="failed",
+                             error_message=f"Генерация прервана {job['attempts']} раз, попытки исчерпаны")
+            logger.error(f"❌ Job {job_id}: попытки возобновления исчерпаны")
+            continue
+
+        request = GenerationRequest(**job["request"])
+        threading.Thread(target=_generate_presentation_task, args=(job_id, request), daemon=True).start()
+        resumed += 1
+    return resumed
 
 
 @router.post("/presentation", response_model=GenerationResponse)
 async def generate_presentation(request: GenerationRequest, background_tasks: BackgroundTasks):
-    if not document_index.documents:
-        raise HTTPException(status_code=400, detail="Сначала загрузите документы")
+    await asyncio.to_thread(_project_index, request.project_id)
 
     job_id = str(uuid.uuid4())
     now = datetime.now().isoformat()
 
-    generation_status[job_id] = {
+    job_store.create({
         "job_id": job_id,
         "status": "pending",
         "progress": 0,
         "slides_generated": [],
         "created_at": now,
         "updated_at": now,
-        "presentation_data": None
-    }
+        "presentation_data": None,
+        "request": request.model_dump(),
+        "worker_id": worker_id(),
+        "lease_until": time.time() + settings.JOB_LEASE_SECONDS
+    })
 
     background_tasks.add_task(_generate_presentation_task, job_id, request)
 
@@ -164,13 +274,71 @@ async def generate_presentation(request: GenerationRequest, background_tasks: Ba
     )
 
 
+@router.post("/presentation/{job_id}/slides/{slide_index}")
+def regenerate_slide(job_id: str, slide_index: int, request: Optional[SlideRegenerationRequest] = None):
+    """Перегенерирует один слайд готовой презентации.
+
+    Берет сохраненный контекст слайда и параметры задачи, остальные слайды
+    не трогает, в PPTX меняется только текст этого слайда. Синхронный
+    обработчик: FastAPI выполняет его в пуле потоков, ответ - новый слайд.
+    """
+    request = request or SlideRegenerationRequest()
+
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] != "completed":
+        raise HTTPException(status_code=400, detail="Presentation not ready")
+
+    slides = job["slides_generated"]
+    if not 0 <= slide_index < len(slides):
+        raise HTTPException(status_code=404, detail="Slide not found")
+
+    slide = slides[slide_index]
+    params = {**GenerationRequest().model_dump(), **job.get("request", {})}
+    audience = request.audience or params["audience"]
+
+    context = slide.get("context")
+    if context is None or request.refresh_context:
+        # Задача создана до сохранения контекста или документы проекта обновились
+        document_index = _project_index(params["project_id"])
+        context = _search_relevant_context(document_index, slide["slide_type"], slide["title"])
+
+    logger.info(f"📝 Перегенерация слайда {slide_index + 1} ({slide['title']}) для job {job_id}")
+    generation_result = content_generator.generate_slide_content(slide["slide_type"], context, audience)
+
+    new_slide = {
+        **slide,
+        "content": generation_result["content"],
+        "context": context,
+        "status": "success",
+        "regenerated_at": datetime.now().isoformat()
+    }
+
+    def patch(presentation_data: bytes) -> bytes:
+        builder = PresentationBuilder.from_bytes(presentation_data)
+        builder.replace_slide(slide_index, new_slide["title"], new_slide["content"])
+        return builder.save_to_bytes().getvalue()
+
+    if not job_store.replace_slide(job_id, slide_index, new_slide, patch):
+        raise HTTPException(status_code=404, detail="Slide not found")
+
+    logger.info(f"✅ Слайд {slide_index + 1} обновлен")
+    return {
+        "job_id": job_id,
+        "slide_index": slide_index,
+        "slide_type": new_slide["slide_type"],
+        "title": new_slide["title"],
+        "content": new_slide["content"]
+    }
+
+
 @router.get("/download/{job_id}")
 async def download_presentation(job_id: str):
-    if job_id not in generation_status:
+    status_data = job_store.get(job_id, with_data=True)
+    if status_data is None:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    status_data = generation_status[job_id]
-
     if status_data["status"] != "completed":
         raise HTTPException(status_code=400, detail="Presentation not ready")
 
@@ -186,11 +354,10 @@ async def download_presentation(job_id: str):
 
 @router.get("/status/{job_id}")
 async def get_generation_status(job_id: str):
-    if job_id not in generation_status:
+    status_data = job_store.get(job_id)
+    if status_data is None:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    status_data = generation_status[job_id]
-
     return {
         "job_id": job_id,
         "status": status_data["status"],
@@ -6,6 +6,7 @@ from fastapi import APIRouter, UploadFile, File, HTTPException
 from pathlib import Path
 from pydantic import BaseModel
 from app.core.presentation_analyzer import analyze_template
+from app.core.storage import templates_store
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -23,10 +24,6 @@ class TemplateInfo(BaseModel):
     layouts: List[str]
 
 
-# Хранилище шаблонов в памяти
-templates_store = {}
-
-
 @router.post("/upload")
 async def upload_template(file: UploadFile = File(...), template_name: str = "Пользовательский шаблон"):
     """Загрузка PowerPoint шаблона"""
@@ -46,14 +43,14 @@ async def upload_template(file: UploadFile = File(...), template_name: str = "П
         template_info = analyze_template(file_path)
 
         # Сохраняем в хранилище
-        templates_store[template_id] = {
+        templates_store.add({
             "id": template_id,
             "name": template_name,
             "filename": file.filename,
             "file_path": str(file_path),
             "slides_count": template_info.slides_count,
             "layouts": template_info.layouts
-        }
+        })
 
         return {
             "template_id": template_id,
@@ -70,7 +67,7 @@ async def upload_template(file: UploadFile = File(...), template_name: str = "П
 @router.get("/")
 async def list_templates():
     """Список загруженных шаблонов"""
-    return list(templates_store.values())
+    return templates_store.list()
 
 
 @router.delete("/{template_id}")
@@ -86,7 +83,7 @@ async def delete_template(template_id: str):
             file_path.unlink()
 
         # Удаляем из хранилища
-        del templates_store[template_id]
+        templates_store.delete(template_id)
 
         return {"message": "Шаблон удален"}
     except Exception as e:
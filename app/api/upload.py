@@ -1,26 +1,130 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException
-from app.core.parser import extract_text_from_file
-from app.core.embeddings import document_index
+from fastapi.responses import StreamingResponse
+from typing import Any, AsyncIterator, Dict, List
+import asyncio
+import json
 import logging
+import time
+from app.core.parser import SUPPORTED_EXTENSIONS, extract_text_from_file
+from app.core.embeddings import index_registry
+from app.core.ingest import content_hash, expand_upload, parse_files
+from app.config import settings
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+
+def _index_documents(document_index, documents: List[dict]) -> int:
+    """Нарезка, кодирование и запись индекса - в пуле потоков, не в цикле событий."""
+    document_index.add_documents(documents)
+    document_index.build_index()
+    return len(document_index.documents)
+
+
 @router.post("/")
-async def upload_file(file: UploadFile = File(...)):
+async def upload_file(file: UploadFile = File(...), project_id: str = settings.DEFAULT_PROJECT_ID):
     try:
-        if not file.filename.lower().endswith(('.txt', '.docx', '.pdf', '.xlsx')):
+        if not file.filename.lower().endswith(SUPPORTED_EXTENSIONS):
             raise HTTPException(status_code=400, detail="Неподдерживаемый формат")
 
+        # Индекс читается с диска - не в цикле событий
+        document_index = await asyncio.to_thread(index_registry.get, project_id)
         document_data = await extract_text_from_file(file)
-        document_index.add_documents([document_data])
-        document_index.build_index()
+        await asyncio.to_thread(_index_documents, document_index, [document_data])
 
         return {
             "filename": file.filename,
+            "project_id": project_id,
             "characters": len(document_data["text"]),
             "status": "success"
         }
 
     except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def _ingest_events(files: List[UploadFile], project_id: str) -> AsyncIterator[Dict[str, Any]]:
+    """События пакетной загрузки: результат по каждому файлу, затем итог.
+
+    Файлы (и содержимое ZIP) разбираются параллельно в пуле процессов, копии
+    с одинаковым содержимым пропускаются, все фрагменты кодируются одним
+    проходом ``build_index`` с одной записью индекса в конце.
+    """
+    started = time.perf_counter()
+    document_index = await asyncio.to_thread(index_registry.get, project_id)
+
+    to_parse = []
+    seen: Dict[str, str] = {}
+    for file in files:
+        try:
+            entries = expand_upload(file.filename, await file.read())
+        except ValueError as e:
+            yield {"filename": file.filename, "status": "error", "error": str(e)}
+            continue
+
+        for filename, content in entries:
+            if not filename.lower().endswith(SUPPORTED_EXTENSIONS):
+                yield {"filename": filename, "status": "skipped", "error": "Неподдерживаемый формат"}
+                continue
+            digest = content_hash(content)
+            if digest in seen:
+                yield {"filename": filename, "status": "duplicate", "duplicate_of": seen[digest]}
+                continue
+            seen[digest] = filename
+            to_parse.append((filename, content))
+
+    documents = []
+    async for outcome in parse_files(to_parse):
+        if "error" in outcome:
+            yield {"filename": outcome["filename"], "status": "error", "error": outcome["error"]}
+            continue
+        document = outcome["document"]
+        documents.append(document)
+        yield {"filename": outcome["filename"], "status": "parsed", "characters": len(document["text"])}
+
+    parsed_seconds = time.perf_counter() - started
+    chunks = await asyncio.to_thread(_index_documents, document_index, documents)
+
+    logger.info(
+        f"Пакетная загрузка в {project_id}: {len(documents)} файлов, "
+        f"разбор {parsed_seconds:.1f} с, всего {time.perf_counter() - started:.1f} с"
+    )
+    yield {
+        "status": "completed",
+        "project_id": project_id,
+        "indexed": len(documents),
+        "chunks": chunks,
+        "seconds": round(time.perf_counter() - started, 2)
+    }
+
+
+@router.post("/bulk")
+async def upload_bulk(files: List[UploadFile] = File(...), project_id: str = settings.DEFAULT_PROJECT_ID,
+                      stream: bool = False):
+    """Загрузка многих файлов или ZIP-архивов за один запрос.
+
+    При ``stream=true`` ответ - NDJSON: строка на каждый файл по мере разбора
+    и итоговая строка после записи индекса.
+    """
+    try:
+        index_registry.validate_project_id(project_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    events = _ingest_events(files, project_id)
+    if stream:
+        async def lines():
+            async for event in events:
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    results = [event async for event in events]
+    summary = results.pop()
+    summary["files"] = results
+    summary["errors"] = sum(1 for r in results if r["status"] == "error")
+    summary["duplicates"] = sum(1 for r in results if r["status"] == "duplicate")
+    # Проиндексированы все разобранные файлы
+    for r in results:
+        if r["status"] == "parsed":
+            r["status"] = "indexed"
+    return summary
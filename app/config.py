@@ -1,3 +1,5 @@
+from typing import Dict
+
 from pydantic_settings import BaseSettings
 
 
@@ -6,7 +8,83 @@ class Settings(BaseSettings):
     MAX_NEW_TOKENS: int = 200
     TEMPERATURE: float = 0.3
 
+    # Эмбеддинги: бэкенд torch | onnx | int8 и формат хранения float32 | float16 | int8
+    EMBEDDING_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
+    EMBEDDING_BACKEND: str = "torch"
+    EMBEDDING_ONNX_INT8_FILE: str = "onnx/model_quint8_avx2.onnx"
+    EMBEDDING_STORAGE_DTYPE: str = "int8"
+    EMBEDDING_BATCH_TOKENS: int = 8192
+    EMBEDDING_MAX_BATCH_SIZE: int = 256
+    EMBEDDING_RECALL_CHECK: bool = True
+    EMBEDDING_MIN_RECALL: float = 0.95
+
+    # Каталог для SQLite-хранилища задач/шаблонов и файлов индекса
+    DATA_DIR: str = "data"
+
+    # Задачи генерации: аренда задачи воркером и возобновление после падения
+    JOB_LEASE_SECONDS: int = 300
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RESUME_INTERVAL_SECONDS: int = 60
+
+    # Индексы документов по проектам: бюджет памяти и выгрузка простаивающих
+    INDEX_MEMORY_BUDGET_MB: int = 1024
+    INDEX_IDLE_SECONDS: int = 900
+    DEFAULT_PROJECT_ID: str = "default"
+
+    # Пакетная загрузка: процессы для разбора файлов (0 - четверть ядер воркера) и лимит распакованного архива
+    UPLOAD_PARSE_WORKERS: int = 0
+    UPLOAD_MAX_ARCHIVE_MB: int = 512
+
+    # Нарезка документов на фрагменты при загрузке
+    CHUNK_CHARS: int = 1000
+    CHUNK_OVERLAP_CHARS: int = 150
+
+    # Свертка почти одинаковых фрагментов (MinHash + LSH) при загрузке
+    DEDUP_ENABLED: bool = True
+    DEDUP_THRESHOLD: float = 0.85
+    DEDUP_NUM_PERM: int = 64
+    DEDUP_BANDS: int = 16
+    DEDUP_SHINGLE_SIZE: int = 5
+
+    # Контекст промпта: сколько фрагментов искать и бюджет токенов по типу слайда
+    CONTEXT_SEARCH_K: int = 8
+    CONTEXT_TOKEN_BUDGET: int = 384
+    CONTEXT_TOKEN_BUDGETS: Dict[str, int] = {
+        "title": 128,
+        "problem": 384,
+        "solution": 384,
+        "market": 512,
+        "finance": 512,
+        "team": 256,
+        "summary": 512
+    }
+
+    # Показатели из таблиц документов для слайдов финансов и рынка: сколько строк добавлять в контекст
+    TABLE_FACTS_LIMIT: int = 8
+
+    # Гибридный поиск: BM25 отбирает кандидатов, эмбеддинги их переранжируют
+    HYBRID_CANDIDATES: int = 200
+    HYBRID_DENSE_WEIGHT: float = 0.6
+    BM25_K1: float = 1.5
+    BM25_B: float = 0.75
+
+    # Ядра воркера по нагрузкам: потоки torch для LLM и эмбеддера (0 - 3/4 и 1/4 ядер)
+    CPU_LLM_THREADS: int = 0
+    CPU_EMBEDDING_THREADS: int = 0
+    CPU_PARSE_NICE: int = 10  # приоритет процессов разбора файлов ниже генерации
+    # Загрузка документов ждет, пока оценка времени на слайд выше SLO * INGEST_THROTTLE_RATIO
+    GENERATION_SLIDE_SLO_SECONDS: float = 20.0
+    INGEST_THROTTLE: bool = True
+    INGEST_THROTTLE_RATIO: float = 0.8
+    INGEST_MAX_PAUSE_SECONDS: float = 5.0
+
+    # Запуск через python -m app.server
+    HOST: str = "0.0.0.0"
+    PORT: int = 8000
+    WORKERS: int = 1
+    WORKER_THREADS: int = 0  # 0 - поровну делим ядра между воркерами
+
     class Config:
         env_file = ".env"
 
-settings = Settings()
\ No newline at end of file
+settings = Settings()
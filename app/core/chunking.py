@@ -0,0 +1,65 @@
+import re
+from typing import List
+
+_PARAGRAPH_RE = re.compile(r"\n+")
+_SENTENCE_RE = re.compile(r"(?<=[.!?…])\s+")
+
+
+def _split_long(text: str, max_chars: int) -> List[str]:
+    """Режет слишком длинный абзац по предложениям, а предложения - по словам."""
+    parts = []
+    for sentence in _SENTENCE_RE.split(text):
+        if len(sentence) <= max_chars:
+            parts.append(sentence)
+            continue
+
+        current = ""
+        for word in sentence.split():
+            if current and len(current) + 1 + len(word) > max_chars:
+                parts.append(current)
+                current = word
+            else:
+                current = f"{current} {word}" if current else word
+        if current:
+            parts.append(current)
+    return parts
+
+
+def overlap_tail(text: str, max_chars: int) -> str:
+    """Хвост текста не длиннее max_chars, начинающийся с начала слова.
+
+    Этот хвост и пробел после него начинают следующий фрагмент; по нему же
+    перекрытие вырезается при сборке контекста.
+    """
+    if max_chars <= 0 or len(text) <= max_chars:
+        return ""
+    tail = text[-max_chars:]
+    space = tail.find(" ")
+    return tail[space + 1:] if space != -1 else ""
+
+
+def split_into_chunks(text: str, max_chars: int = 1000, overlap_chars: int = 150) -> List[str]:
+    """Делит текст на фрагменты по абзацам с небольшим перекрытием соседних фрагментов."""
+    units = []
+    for paragraph in _PARAGRAPH_RE.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) <= max_chars:
+            units.append(paragraph)
+        else:
+            units.extend(_split_long(paragraph, max_chars))
+
+    chunks = []
+    current = ""
+    for unit in units:
+        if current and len(current) + 1 + len(unit) > max_chars:
+            chunks.append(current)
+            tail = overlap_tail(current, overlap_chars)
+            current = f"{tail} {unit}" if tail and len(tail) + 1 + len(unit) <= max_chars else unit
+        else:
+            current = f"{current}\n{unit}" if current else unit
+
+    if current:
+        chunks.append(current)
+    return chunks
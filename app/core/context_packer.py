@@ -0,0 +1,161 @@
+import re
+import logging
+from typing import Dict, List, Sequence, Set
+
+from app.config import settings
+from app.core.chunking import overlap_tail
+from app.core.llm_generator import content_generator
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+DEFAULT_CONTEXT = "Проект представляет инновационное решение"
+
+
+def _shingles(text: str, size: int = 3) -> Set[tuple]:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < size:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class ContextPacker:
+    """Собирает контекст для промпта в точный бюджет токенов.
+
+    Фрагменты ранжируются по релевантности, перекрытие соседних фрагментов
+    одного документа (тот же source, chunk_id подряд) вырезается, почти
+    одинаковые пропускаются, последний фрагмент обрезается по токенам до
+    границы слова. Токены считаются токенизатором LLM.
+
+    Готовые показатели из таблиц (``facts``) идут первым блоком и занимают
+    не больше половины бюджета, остальное достается фрагментам.
+    """
+
+    def __init__(self, tokenizer, budgets: Dict[str, int], default_budget: int,
+                 separator: str = "\n---\n", duplicate_threshold: float = 0.8,
+                 min_partial_tokens: int = 32):
+        self.tokenizer = tokenizer
+        self.budgets = budgets
+        self.default_budget = default_budget
+        self.separator = separator
+        self.duplicate_threshold = duplicate_threshold
+        self.min_partial_tokens = min_partial_tokens
+
+    def budget_for(self, slide_type: str) -> int:
+        return self.budgets.get(slide_type, self.default_budget)
+
+    def count_tokens(self, text: str) -> int:
+        return len(self.tokenizer.encode(text, add_special_tokens=False))
+
+    def _truncate(self, text: str, max_tokens: int) -> str:
+        ids = self.tokenizer.encode(text, add_special_tokens=False)
+        if len(ids) <= max_tokens:
+            return text
+
+        truncated = self.tokenizer.decode(ids[:max_tokens], skip_special_tokens=True)
+        # Не оставляем оборванное слово в конце
+        cut = max(truncated.rfind(" "), truncated.rfind("\n"))
+        truncated = truncated[:cut] if cut > 0 else ""
+        # Декодирование может дать на токен больше, чем было - перепроверяем
+        while truncated and self.count_tokens(truncated) > max_tokens:
+            truncated = truncated[:truncated.rfind(" ")] if " " in truncated else ""
+        return truncated.rstrip()
+
+    def _strip_overlap(self, chunk: dict, text: str, selected_chunks: List[dict]) -> str:
+        """Вырезает из ``text`` перекрытие с уже выбранными соседями по документу.
+
+        Перекрытие - ровно тот хвост предыдущего фрагмента, который
+        ``split_into_chunks`` дописал в начало следующего; совпадения
+        у несоседних фрагментов не трогаем.
+        """
+        for other in selected_chunks:
+            if other.get("source") != chunk.get("source"):
+                continue
+            step = chunk.get("chunk_id", 0) - other.get("chunk_id", 0)
+            if step == 1:
+                tail = overlap_tail(other["content"], settings.CHUNK_OVERLAP_CHARS)
+                if tail and text.startswith(f"{tail} "):
+                    text = text[len(tail) + 1:]
+            elif step == -1:
+                tail = overlap_tail(chunk["content"], settings.CHUNK_OVERLAP_CHARS)
+                if tail and other["content"].startswith(f"{tail} ") and text.endswith(tail):
+                    text = text[:-len(tail)]
+        return text.strip()
+
+    def _is_duplicate(self, shingles: Set[tuple], selected_shingles: List[Set[tuple]]) -> bool:
+        if not shingles:
+            return True
+        for other in selected_shingles:
+            if len(shingles & other) / len(shingles | other) >= self.duplicate_threshold:
+                return True
+            # Фрагмент целиком содержится в уже выбранном
+            if shingles <= other:
+                return True
+        return False
+
+    def _facts_block(self, facts: Sequence[str], max_tokens: int) -> str:
+        lines = ["Показатели из таблиц:"]
+        for fact in facts:
+            if self.count_tokens("\n".join(lines + [f"- {fact}"])) > max_tokens:
+                break
+            lines.append(f"- {fact}")
+        return "\n".join(lines) if len(lines) > 1 else ""
+
+    def pack(self, chunks: List[dict], slide_type: str, facts: Sequence[str] = ()) -> str:
+        """``chunks`` - результаты ``DocumentIndex.search_chunks`` с полями content и score."""
+        budget = self.budget_for(slide_type)
+        separator_tokens = self.count_tokens(self.separator)
+
+        selected: List[str] = []
+        selected_shingles: List[Set[tuple]] = []
+        selected_chunks: List[dict] = []
+        used = 0
+
+        facts_block = self._facts_block(facts, budget // 2) if facts else ""
+        if facts_block:
+            selected.append(facts_block)
+            selected_shingles.append(_shingles(facts_block))
+            used += self.count_tokens(facts_block)
+
+        for chunk in sorted(chunks, key=lambda c: c["score"], reverse=True):
+            text = self._strip_overlap(chunk, chunk["content"], selected_chunks)
+            shingles = _shingles(text)
+            if self._is_duplicate(shingles, selected_shingles):
+                continue
+
+            cost = self.count_tokens(text) + (separator_tokens if selected else 0)
+            remaining = budget - used
+            if cost <= remaining:
+                selected.append(text)
+                selected_shingles.append(shingles)
+                selected_chunks.append(chunk)
+                used += cost
+                continue
+
+            available = remaining - (separator_tokens if selected else 0)
+            if available >= self.min_partial_tokens:
+                partial = self._truncate(text, available)
+                if partial:
+                    selected.append(partial)
+                    used += self.count_tokens(partial) + (separator_tokens if len(selected) > 1 else 0)
+            break
+
+        if not selected:
+            return DEFAULT_CONTEXT
+
+        context = self.separator.join(selected)
+        # На стыках BPE может склеить токены иначе, чем по отдельности
+        if self.count_tokens(context) > budget:
+            context = self._truncate(context, budget)
+
+        logger.info(f"Контекст для слайда {slide_type}: {len(selected)} фрагментов"
+                    f"{' (с показателями таблиц)' if facts_block else ''}, ~{used}/{budget} токенов")
+        return context
+
+
+context_packer = ContextPacker(
+    content_generator.tokenizer,
+    budgets=settings.CONTEXT_TOKEN_BUDGETS,
+    default_budget=settings.CONTEXT_TOKEN_BUDGET
+)
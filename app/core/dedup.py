@@ -0,0 +1,171 @@
+import re
+import zlib
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+# Значение подписи текста без слов
+_EMPTY = np.uint32(0xFFFFFFFF)
+
+
+class MinHasher:
+    """MinHash-подписи по словесным шинглам.
+
+    Слова хешируются crc32, а не ``hash()``: подписи сохраняются вместе с индексом
+    и должны совпадать между процессами и перезапусками. Хеш шингла - сумма хешей
+    его слов с позиционными множителями, перестановки - multiply-shift
+    ``(a * x + b) >> 32`` в uint64 без взятия по модулю.
+    """
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 5, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._positions = rng.integers(1, 1 << 63, size=shingle_size, dtype=np.uint64) | np.uint64(1)
+        self._a = rng.integers(1, 1 << 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 1 << 63, size=num_perm, dtype=np.uint64)
+
+    @staticmethod
+    def _word_hashes(text: str) -> List[int]:
+        return [zlib.crc32(word.encode("utf-8")) for word in _WORD_RE.findall(text.lower().replace("ё", "е"))]
+
+    def _shingle_hashes(self, lengths: np.ndarray, words: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Хеши шинглов блока текстов и номер текста для каждого шингла.
+
+        Шингл начинается с каждого слова, кроме последних ``shingle_size - 1``;
+        текст короче шингла дает один шингл из всех своих слов.
+        """
+        text_ids = np.repeat(np.arange(len(lengths)), lengths)
+        starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+        positions = np.arange(len(words)) - starts
+        length_of = lengths[text_ids]
+
+        valid = positions <= np.maximum(length_of - self.shingle_size, 0)
+        padded = np.concatenate([words, np.zeros(self.shingle_size, dtype=np.uint64)])
+        hashes = np.zeros(len(words), dtype=np.uint64)
+        with np.errstate(over="ignore"):
+            for offset, multiplier in enumerate(self._positions):
+                inside = positions + offset < length_of
+                hashes += np.where(inside, padded[offset:offset + len(words)] * multiplier, np.uint64(0))
+        return hashes[valid] >> np.uint64(32), text_ids[valid]
+
+    def signatures(self, texts: List[str], block_size: int = 2048) -> np.ndarray:
+        """Подписи (n, num_perm); у текста без слов все значения равны _EMPTY."""
+        result = np.full((len(texts), self.num_perm), _EMPTY, dtype=np.uint32)
+        for start in range(0, len(texts), block_size):
+            per_text = [self._word_hashes(text) for text in texts[start:start + block_size]]
+            lengths = np.array([len(hashes) for hashes in per_text], dtype=np.int64)
+            if not lengths.any():
+                continue
+
+            words = np.fromiter((h for hashes in per_text for h in hashes), dtype=np.uint64, count=lengths.sum())
+            shingles, text_ids = self._shingle_hashes(lengths, words)
+            with np.errstate(over="ignore"):
+                permuted = ((shingles[:, None] * self._a + self._b) >> np.uint64(32)).astype(np.uint32)
+
+            # Шинглы идут по порядку текстов - минимум по каждому через reduceat
+            rows, offsets = np.unique(text_ids, return_index=True)
+            result[start + rows] = np.minimum.reduceat(permuted, offsets, axis=0)
+        return result
+
+
+def is_empty(signature: np.ndarray) -> bool:
+    """Подпись текста без слов: такие фрагменты не сворачиваются."""
+    return bool(signature[0] == _EMPTY)
+
+
+class LSHIndex:
+    """LSH с разбиением подписи на полосы.
+
+    Кандидаты - фрагменты, у которых совпала хотя бы одна полоса; затем доля
+    совпавших позиций подписи (оценка Жаккара) сравнивается с порогом.
+    Записанные фрагменты ищутся по отсортированным хешам полос через
+    searchsorted, внутри новой пачки кандидаты находятся через ``np.unique``,
+    так что Python-цикл идет только по фрагментам с совпавшими полосами.
+    """
+
+    def __init__(self, num_perm: int, bands: int, threshold: float,
+                 signatures: Optional[np.ndarray] = None):
+        if num_perm % bands:
+            raise ValueError(f"Число перестановок {num_perm} не делится на число полос {bands}")
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self._multipliers = np.random.default_rng(0).integers(
+            1, 1 << 63, size=self.rows, dtype=np.uint64) | np.uint64(1)
+
+        if signatures is None:
+            signatures = np.zeros((0, num_perm), dtype=np.uint32)
+        self._signatures = np.asarray(signatures, dtype=np.uint32)
+        hashes = self.band_hashes(self._signatures)
+        # Пустые подписи ни с чем не совпадают
+        hashes[self._signatures[:, 0] == _EMPTY] = np.uint64(0)
+        self._order = np.argsort(hashes, axis=0, kind="stable").T
+        self._sorted_hashes = np.take_along_axis(hashes, self._order.T, axis=0).T
+
+    def band_hashes(self, signatures: np.ndarray) -> np.ndarray:
+        """Хеш каждой полосы, (n, bands); переполнение uint64 здесь допустимо."""
+        rows = signatures.reshape(len(signatures), self.bands, self.rows).astype(np.uint64)
+        with np.errstate(over="ignore"):
+            return (rows * self._multipliers).sum(axis=2, dtype=np.uint64)
+
+    def _best(self, signature: np.ndarray, keys: List[int], signatures: np.ndarray) -> Optional[int]:
+        similarity = (signatures == signature).mean(axis=1)
+        best = int(np.argmax(similarity))
+        return keys[best] if similarity[best] >= self.threshold else None
+
+    def query_many(self, signatures: np.ndarray, hashes: np.ndarray) -> List[Optional[int]]:
+        """Для каждой подписи - самый похожий из записанных фрагментов или None."""
+        candidates: Dict[int, set] = defaultdict(set)
+        if len(self._signatures):
+            for band in range(self.bands):
+                row = self._sorted_hashes[band]
+                lo = np.searchsorted(row, hashes[:, band], side="left")
+                hi = np.searchsorted(row, hashes[:, band], side="right")
+                for i in np.flatnonzero(hi > lo).tolist():
+                    candidates[i].update(self._order[band, lo[i]:hi[i]].tolist())
+
+        result: List[Optional[int]] = [None] * len(signatures)
+        for i, keys in candidates.items():
+            if not is_empty(signatures[i]):
+                keys = sorted(keys)
+                result[i] = self._best(signatures[i], keys, self._signatures[keys])
+        return result
+
+    def group(self, signatures: np.ndarray, hashes: np.ndarray,
+              exclude: Optional[np.ndarray] = None) -> List[Optional[int]]:
+        """Почти-дубликаты внутри пачки.
+
+        Для каждой подписи - номер более ранней подписи пачки, к которой она
+        сворачивается, или None, если подпись сама остается. Подписи из
+        ``exclude`` не сворачиваются и не принимают другие.
+        """
+        group_ids = np.empty(hashes.shape, dtype=np.int64)
+        shared = np.zeros(len(signatures), dtype=bool)
+        for band in range(self.bands):
+            _, inverse, counts = np.unique(hashes[:, band], return_inverse=True, return_counts=True)
+            group_ids[:, band] = inverse
+            shared |= counts[inverse] > 1
+        shared &= signatures[:, 0] != _EMPTY
+        if exclude is not None:
+            shared &= ~exclude
+
+        result: List[Optional[int]] = [None] * len(signatures)
+        kept: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+        for i in np.flatnonzero(shared).tolist():
+            buckets = list(enumerate(group_ids[i].tolist()))
+            keys = sorted({key for bucket in buckets for key in kept.get(bucket, ())})
+            if keys:
+                result[i] = self._best(signatures[i], keys, signatures[keys])
+            if result[i] is None:
+                for bucket in buckets:
+                    kept[bucket].append(i)
+        return result
+
+
+minhasher = MinHasher(settings.DEDUP_NUM_PERM, settings.DEDUP_SHINGLE_SIZE)
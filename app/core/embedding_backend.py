@@ -0,0 +1,84 @@
+from sentence_transformers import SentenceTransformer
+from typing import List, Optional
+import logging
+
+import numpy as np
+
+from app.config import settings
+from app.core.resources import Workload, governor
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("torch", "onnx", "int8")
+
+
+def load_embedding_model() -> SentenceTransformer:
+    """Загружает эмбеддер с выбранным бэкендом.
+
+    torch - исходная модель в fp32; onnx - тот же граф в ONNX Runtime;
+    int8 - динамически квантованный ONNX-файл из репозитория модели.
+    """
+    backend = settings.EMBEDDING_BACKEND
+    logger.info(f"Загрузка эмбеддера {settings.EMBEDDING_MODEL}, бэкенд: {backend}")
+
+    if backend == "torch":
+        return SentenceTransformer(settings.EMBEDDING_MODEL)
+    if backend == "onnx":
+        return SentenceTransformer(settings.EMBEDDING_MODEL, backend="onnx")
+    if backend == "int8":
+        return SentenceTransformer(
+            settings.EMBEDDING_MODEL,
+            backend="onnx",
+            model_kwargs={"file_name": settings.EMBEDDING_ONNX_INT8_FILE}
+        )
+    raise ValueError(f"Неизвестный бэкенд эмбеддингов: {backend}. Доступны: {', '.join(BACKENDS)}")
+
+
+def _estimate_tokens(text: str, max_seq_length: int) -> int:
+    # ~3 символа на токен для смеси русского и английского, плюс CLS/SEP
+    return min(max_seq_length, len(text) // 3 + 2)
+
+
+def encode_texts(model: SentenceTransformer, texts: List[str], workload: Optional[Workload] = None) -> np.ndarray:
+    """Кодирует тексты в нормированные float32-векторы с динамическим размером батча.
+
+    Тексты сортируются по длине, и батч набирается, пока
+    ``число_текстов * длина_самого_длинного`` не превысит EMBEDDING_BATCH_TOKENS.
+    Короткие тексты идут большими батчами, длинные - маленькими, паддинга почти нет.
+    С ``workload`` (загрузка документов) между батчами уступает генерации, близкой к SLO,
+    и пересчитывает число потоков под соседние нагрузки.
+    """
+    if not texts:
+        return np.zeros((0, model.get_sentence_embedding_dimension()), dtype=np.float32)
+
+    max_seq_length = getattr(model, "max_seq_length", None) or 256
+    lengths = np.array([_estimate_tokens(text, max_seq_length) for text in texts])
+    order = np.argsort(lengths, kind="stable")
+
+    result = np.empty((len(texts), model.get_sentence_embedding_dimension()), dtype=np.float32)
+    start = 0
+    while start < len(order):
+        end = start + 1
+        # Порядок возрастающий, поэтому самый длинный в батче - последний
+        while (end < len(order)
+               and end - start < settings.EMBEDDING_MAX_BATCH_SIZE
+               and (end - start + 1) * lengths[order[end]] <= settings.EMBEDDING_BATCH_TOKENS):
+            end += 1
+
+        if workload is not None:
+            if start:
+                governor.ingest_pause()
+            # Соседние нагрузки могли начаться или закончиться с прошлого батча
+            governor.retune(workload)
+
+        batch = order[start:end]
+        result[batch] = model.encode(
+            [texts[i] for i in batch],
+            batch_size=len(batch),
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        )
+        start = end
+
+    return result
@@ -1,53 +1,252 @@
-from sentence_transformers import SentenceTransformer
-from typing import List, Tuple
+from collections import Counter, OrderedDict
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import fcntl
+import json
+import os
+import re
+import threading
+import time
 import logging
 
+import numpy as np
+
+from app.config import settings
+from app.core.chunking import split_into_chunks
+from app.core.dedup import LSHIndex, minhasher
+from app.core.embedding_backend import encode_texts, load_embedding_model
+from app.core.lexical import InvertedIndex, tokenize
+from app.core.resources import governor
+from app.core.table_facts import TableStore, extract_series
+from app.core.vector_storage import dequantize, dot_scores, quantize, recall_at_k
+
 logger = logging.getLogger(__name__)
 
-model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+model = load_embedding_model()
 
 
 class DocumentIndex:
-    def __init__(self):
-        self.documents = []
+    """Индекс документов: эмбеддинги плюс инвертированный индекс BM25.
+
+    Поиск гибридный: BM25 по постингам термов запроса отбирает кандидатов,
+    плотные эмбеддинги пересчитываются только для них, оценки смешиваются.
+    Если ни один терм не найден, выполняется полный плотный поиск.
+
+    Почти одинаковые фрагменты (повторяющиеся дисклеймеры, версии одной записки)
+    сворачиваются при загрузке по MinHash + LSH: хранится один вектор, а в
+    ``sources`` перечислены все файлы, где встретился фрагмент.
+
+    Таблицы документов не нарезаются на фрагменты: ряды финансовых метрик
+    по годам с посчитанными динамикой и итогами хранятся в ``tables``
+    и отдаются слайдам финансов и рынка через ``table_facts``.
+
+    Векторы нормированы и хранятся в формате EMBEDDING_STORAGE_DTYPE
+    (float32, float16 или int8 с масштабом на вектор).
+
+    Если задан ``storage_dir``, индекс хранится на диске версиями
+    (``documents.<v>.json`` + ``embeddings.<v>.npy``), а ``manifest.json``
+    указывает на актуальную. Читатели открывают эмбеддинги через mmap и
+    подхватывают новую версию при следующем обращении, поэтому несколько
+    воркеров делят один индекс и страницы в page cache. Запись сериализуется
+    файловой блокировкой.
+    """
+
+    def __init__(self, storage_dir: Optional[str] = None):
+        self.storage_dir = Path(storage_dir) if storage_dir else None
+        self._documents = []
+        self._pending = []
+        self._pending_series = []
         self.embeddings = None
+        self.scales = None
+        self.signatures = None
+        self.lexical = InvertedIndex(settings.BM25_K1, settings.BM25_B)
+        self.tables = TableStore()
         self.is_built = False
+        self._version = 0
+        self._manifest_stat = None
+        self._documents_bytes = 0
+        self._lexical_bytes = 0
+        self.last_access = time.monotonic()
+        # build_index вызывается из потоков пула - одна сборка за раз
+        self._build_lock = threading.Lock()
+
+        if self.storage_dir:
+            self.storage_dir.mkdir(parents=True, exist_ok=True)
+            self._refresh()
+
+    @property
+    def documents(self) -> List[dict]:
+        self._refresh()
+        return self._documents + self._pending
 
     def add_documents(self, documents: List[dict]):
+        """Нарезает документы на фрагменты; каждый фрагмент индексируется отдельно."""
         for doc in documents:
             if doc.get("text") and doc["text"].strip():
-                self.documents.append({
-                    "content": doc["text"],
-                    "source": doc["metadata"]["filename"]
-                })
-        logger.info(f"Добавлено документов: {len(self.documents)}")
+                chunks = split_into_chunks(doc["text"], settings.CHUNK_CHARS, settings.CHUNK_OVERLAP_CHARS)
+                for chunk_id, chunk in enumerate(chunks):
+                    self._pending.append({
+                        "content": chunk,
+                        "source": doc["metadata"]["filename"],
+                        "sources": [doc["metadata"]["filename"]],
+                        "chunk_id": chunk_id
+                    })
+            # Показатели таблиц считаются сейчас, а не при генерации слайда
+            for table in doc.get("tables") or []:
+                self._pending_series.extend(extract_series(table, doc["metadata"]["filename"]))
+        logger.info(f"Добавлено фрагментов: {len(self._documents) + len(self._pending)}")
 
     def build_index(self):
-        if not self.documents:
+        """Кодирует только новые документы и дописывает их к индексу."""
+        with self._build_lock:
+            self._build_pending()
+
+    def _build_pending(self):
+        if not self._pending and not self._pending_series:
             return
 
-        texts = [doc["content"] for doc in self.documents]
-        self.embeddings = model.encode(texts, convert_to_numpy=True)
-        self.is_built = True
+        # Снимок: пока идет кодирование, другая загрузка может дописать в очередь
+        pending, pending_series = list(self._pending), list(self._pending_series)
+        self._refresh()
+        new_documents, new_signatures, merges = self._collapse_duplicates(pending)
+        if not new_documents and not merges and not pending_series:
+            del self._pending[:len(pending)]
+            return
 
-    def search(self, query: str, k: int = 5) -> List[Tuple[str, str, str]]:
-        if not self.is_built or not self.documents:
+        texts = [doc["content"] for doc in new_documents]
+        with governor.workload("embedding") as workload:
+            new_embeddings = encode_texts(model, texts, workload)
+        new_terms = [Counter(tokenize(text)) for text in texts]
+
+        dtype = settings.EMBEDDING_STORAGE_DTYPE
+        if dtype != "float32" and settings.EMBEDDING_RECALL_CHECK:
+            recall = recall_at_k(new_embeddings, dtype)
+            log = logger.warning if recall < settings.EMBEDDING_MIN_RECALL else logger.info
+            log(f"Recall@10 хранения {dtype} относительно fp32: {recall:.3f}")
+        new_matrix, new_scales = quantize(new_embeddings, dtype)
+
+        with self._lock():
+            # Пока мы кодировали, другой воркер мог записать свою версию
+            self._refresh()
+            documents = list(self._documents)
+            # Индексы фрагментов только растут, поэтому ссылки на старые фрагменты еще верны
+            for index, source in merges:
+                documents[index] = _with_source(documents[index], source)
+            documents += new_documents
+            signatures = self._committed_signatures()
+            if signatures is not None and new_signatures is not None:
+                signatures = np.concatenate([signatures, new_signatures])
+
+            if not new_documents and self.embeddings is not None:
+                embeddings, scales = self.embeddings, self.scales
+            elif self.embeddings is None or len(self._documents) == 0:
+                embeddings, scales = new_matrix, new_scales
+            elif self.embeddings.dtype == new_matrix.dtype:
+                embeddings = np.concatenate([np.asarray(self.embeddings), new_matrix])
+                scales = None if new_scales is None else np.concatenate([self.scales, new_scales])
+            else:
+                # Формат хранения сменили в настройках - переводим весь индекс
+                old = dequantize(self.embeddings, self.scales)
+                embeddings, scales = quantize(np.concatenate([old, new_embeddings]), dtype)
+
+            lexical = self.lexical.copy()
+            for term_counts in new_terms:
+                lexical.add(term_counts)
+            tables = self.tables.copy()
+            tables.add(pending_series)
+
+            # Удаляем на месте только снимок - дописанное за время сборки останется в очереди
+            del self._pending[:len(pending)]
+            del self._pending_series[:len(pending_series)]
+            self._commit(documents, embeddings, scales, lexical, signatures, tables)
+
+    def _committed_signatures(self) -> Optional[np.ndarray]:
+        """MinHash-подписи записанных фрагментов; для старых индексов считаются по текстам."""
+        if not settings.DEDUP_ENABLED:
+            return None
+        if (self.signatures is None or len(self.signatures) != len(self._documents)
+                or self.signatures.shape[1] != minhasher.num_perm):
+            self.signatures = minhasher.signatures([doc["content"] for doc in self._documents])
+        return self.signatures
+
+    def _collapse_duplicates(self, pending: List[dict]):
+        """Отделяет новые фрагменты от почти-дубликатов уже известных.
+
+        Возвращает (новые фрагменты, их подписи, [(индекс записанного фрагмента, источник)]).
+        Дубликаты внутри пачки сразу добавляют источник к первому вхождению.
+        """
+        if not settings.DEDUP_ENABLED or not pending:
+            return pending, None, []
+
+        committed = self._committed_signatures()
+        signatures = minhasher.signatures([doc["content"] for doc in pending])
+        # LSH строится на одну загрузку и не держит память между ними
+        lsh = LSHIndex(minhasher.num_perm, settings.DEDUP_BANDS, settings.DEDUP_THRESHOLD, committed)
+        hashes = lsh.band_hashes(signatures)
+        matches = lsh.query_many(signatures, hashes)
+        representatives = lsh.group(signatures, hashes, exclude=np.array([m is not None for m in matches]))
+
+        new_documents, new_signatures, merges = [], [], []
+        positions = {}
+        for i, doc in enumerate(pending):
+            if matches[i] is not None:
+                merges.append((matches[i], doc["source"]))
+            elif representatives[i] is not None:
+                position = positions[representatives[i]]
+                new_documents[position] = _with_source(new_documents[position], doc["source"])
+            else:
+                positions[i] = len(new_documents)
+                new_documents.append(doc)
+                new_signatures.append(signatures[i])
+
+        collapsed = len(pending) - len(new_documents)
+        if collapsed:
+            logger.info(f"Свернуто почти одинаковых фрагментов: {collapsed} из {len(pending)}")
+
+        signatures = (np.array(new_signatures, dtype=np.uint32) if new_signatures
+                      else np.zeros((0, minhasher.num_perm), dtype=np.uint32))
+        return new_documents, signatures, merges
+
+    def _dense_scores(self, query_embedding: np.ndarray, ids: Optional[np.ndarray] = None) -> np.ndarray:
+        """Косинусная близость: векторы нормированы, поэтому это скалярное произведение."""
+        if ids is None:
+            return dot_scores(self.embeddings, self.scales, query_embedding)
+        scales = None if self.scales is None else self.scales[ids]
+        return dot_scores(np.asarray(self.embeddings[ids]), scales, query_embedding)
+
+    def search_chunks(self, query: str, k: int = 5) -> List[dict]:
+        """Top-k фрагментов с оценкой близости: content, source, chunk_id, score."""
+        self._refresh()
+        if not self.is_built or not self._documents:
             return []
 
         try:
-            query_embedding = model.encode([query])
+            query_embedding = encode_texts(model, [query])[0]
 
-            # Простое решение - используем numpy напрямую
-            from sklearn.metrics.pairwise import cosine_similarity
-            import numpy as np
+            candidates = self.lexical.search(query, settings.HYBRID_CANDIDATES)
+            if candidates:
+                ids = np.array([doc_id for doc_id, _ in candidates], dtype=np.int64)
+                lexical_scores = np.array([score for _, score in candidates], dtype=np.float32)
+                dense_scores = self._dense_scores(query_embedding, ids)
+                weight = settings.HYBRID_DENSE_WEIGHT
+                scores = weight * dense_scores + (1 - weight) * lexical_scores / lexical_scores.max()
+            else:
+                ids = np.arange(len(self._documents))
+                scores = self._dense_scores(query_embedding)
 
-            similarities = cosine_similarity(query_embedding, self.embeddings)[0]
-            top_indices = np.argsort(similarities)[-k:][::-1]
+            top = np.argsort(scores)[-k:][::-1]
 
             results = []
-            for idx in top_indices:
-                doc = self.documents[idx]
-                results.append((doc["content"], "text", doc["source"]))  # ← здесь все правильно
+            for position in top:
+                doc = self._documents[ids[position]]
+                results.append({
+                    "content": doc["content"],
+                    "source": doc["source"],
+                    "sources": doc.get("sources", [doc["source"]]),
+                    "chunk_id": doc.get("chunk_id", 0),
+                    "score": float(scores[position])
+                })
 
             return results
 
@@ -55,11 +254,293 @@ class DocumentIndex:
             logger.error(f"Ошибка поиска: {e}")
             return []
 
+    def table_facts(self, slide_type: str, limit: Optional[int] = None) -> List[str]:
+        """Готовые строки показателей из таблиц для слайда; пусто, если метрик нет."""
+        self._refresh()
+        return self.tables.facts(slide_type, limit or settings.TABLE_FACTS_LIMIT)
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[str, str, str]]:
+        return [(hit["content"], "text", hit["source"]) for hit in self.search_chunks(query, k)]
+
     def get_stats(self):
+        self._refresh()
+        return {
+            "documents_count": len(self._documents) + len(self._pending),
+            "index_built": self.is_built,
+            "version": self._version,
+            "memory_bytes": self.memory_bytes()
+        }
+
+    def memory_bytes(self) -> int:
+        """Оценка памяти индекса: эмбеддинги, постинги BM25 и тексты документов."""
+        embeddings_bytes = self.embeddings.nbytes if self.embeddings is not None else 0
+        if self.scales is not None:
+            embeddings_bytes += self.scales.nbytes
+        if self.signatures is not None:
+            embeddings_bytes += self.signatures.nbytes
+        return embeddings_bytes + self._lexical_bytes + self._documents_bytes + self.tables.memory_bytes()
+
+    def has_pending(self) -> bool:
+        return bool(self._pending or self._pending_series)
+
+    def _set_state(self, documents: List[dict], embeddings: Optional[np.ndarray],
+                   scales: Optional[np.ndarray], lexical: InvertedIndex,
+                   signatures: Optional[np.ndarray] = None, tables: Optional[TableStore] = None):
+        self._documents, self.embeddings, self.scales, self.lexical = documents, embeddings, scales, lexical
+        self.signatures = signatures
+        self.tables = tables if tables is not None else TableStore()
+        self.is_built = bool(documents)
+        self._lexical_bytes = lexical.memory_bytes()
+        # Строки с кириллицей занимают ~2 байта на символ
+        self._documents_bytes = sum(2 * len(doc["content"]) + 100 for doc in documents)
+
+    # --- Хранение на диске ---
+
+    def _path(self, name: str) -> Path:
+        return self.storage_dir / name
+
+    @contextmanager
+    def _file_lock(self):
+        with open(self._path("index.lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _lock(self):
+        return self._file_lock() if self.storage_dir else nullcontext()
+
+    def _commit(self, documents: List[dict], embeddings: np.ndarray, scales: Optional[np.ndarray],
+                lexical: InvertedIndex, signatures: Optional[np.ndarray] = None,
+                tables: Optional[TableStore] = None):
+        if embeddings is None:
+            # В загрузке были только таблицы - текстовых фрагментов пока нет
+            embeddings = np.zeros((0, model.get_sentence_embedding_dimension()), dtype=np.float32)
+
+        if not self.storage_dir:
+            self._set_state(documents, embeddings, scales, lexical, signatures, tables)
+            return
+
+        version = self._version + 1
+        documents_path = self._path(f"documents.{version}.json")
+        embeddings_path = self._path(f"embeddings.{version}.npy")
+
+        with open(f"{embeddings_path}.tmp", "wb") as f:
+            np.save(f, embeddings)
+        os.replace(f"{embeddings_path}.tmp", embeddings_path)
+
+        if scales is not None:
+            scales_path = self._path(f"scales.{version}.npy")
+            with open(f"{scales_path}.tmp", "wb") as f:
+                np.save(f, scales)
+            os.replace(f"{scales_path}.tmp", scales_path)
+
+        if signatures is not None:
+            minhash_path = self._path(f"minhash.{version}.npy")
+            with open(f"{minhash_path}.tmp", "wb") as f:
+                np.save(f, signatures)
+            os.replace(f"{minhash_path}.tmp", minhash_path)
+
+        with open(f"{documents_path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(documents, f, ensure_ascii=False)
+        os.replace(f"{documents_path}.tmp", documents_path)
+
+        lexical_path = self._path(f"lexical.{version}.json")
+        with open(f"{lexical_path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(lexical.to_dict(), f, ensure_ascii=False)
+        os.replace(f"{lexical_path}.tmp", lexical_path)
+
+        if tables is not None:
+            tables_path = self._path(f"tables.{version}.json")
+            with open(f"{tables_path}.tmp", "w", encoding="utf-8") as f:
+                json.dump(tables.to_dict(), f, ensure_ascii=False)
+            os.replace(f"{tables_path}.tmp", tables_path)
+
+        # Манифест переключается последним - читатели видят либо старую, либо новую версию целиком
+        manifest = {
+            "version": version,
+            "count": len(documents),
+            "dtype": str(embeddings.dtype),
+            "normalized": True
+        }
+        manifest_path = self._path("manifest.json")
+        with open(f"{manifest_path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(f"{manifest_path}.tmp", manifest_path)
+
+        # Предыдущую версию оставляем для читателей, которые еще ее открывают
+        for old in (f"documents.{version - 2}.json", f"embeddings.{version - 2}.npy",
+                    f"scales.{version - 2}.npy", f"minhash.{version - 2}.npy",
+                    f"lexical.{version - 2}.json", f"tables.{version - 2}.json"):
+            try:
+                self._path(old).unlink()
+            except FileNotFoundError:
+                pass
+
+        self._load(manifest)
+        logger.info(f"Индекс сохранен: версия {version}, документов {len(documents)}")
+
+    def _load(self, manifest: dict):
+        version = manifest["version"]
+        with open(self._path(f"documents.{version}.json"), encoding="utf-8") as f:
+            documents = json.load(f)
+        embeddings = np.load(self._path(f"embeddings.{version}.npy"), mmap_mode="r")
+
+        scales = None
+        if manifest.get("dtype") == "int8":
+            scales = np.load(self._path(f"scales.{version}.npy"))
+        elif not manifest.get("normalized"):
+            # Индекс записан до нормировки векторов - нормируем в памяти до следующей записи
+            embeddings = np.asarray(embeddings, dtype=np.float32)
+            embeddings = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+
+        # Подписи нужны только при следующей загрузке - без файла они пересчитаются тогда же
+        minhash_path = self._path(f"minhash.{version}.npy")
+        signatures = np.load(minhash_path, mmap_mode="r") if minhash_path.exists() else None
+
+        lexical_path = self._path(f"lexical.{version}.json")
+        if lexical_path.exists():
+            with open(lexical_path, encoding="utf-8") as f:
+                lexical = InvertedIndex.from_dict(json.load(f))
+        else:
+            # Индекс записан до появления BM25 - строим постинги из текстов
+            lexical = InvertedIndex(settings.BM25_K1, settings.BM25_B)
+            for doc in documents:
+                lexical.add(Counter(tokenize(doc["content"])))
+
+        # Индекс записан до появления хранилища таблиц - показателей нет до следующей загрузки
+        tables_path = self._path(f"tables.{version}.json")
+        tables = None
+        if tables_path.exists():
+            with open(tables_path, encoding="utf-8") as f:
+                tables = TableStore.from_dict(json.load(f))
+
+        self._set_state(documents, embeddings, scales, lexical, signatures, tables)
+        self._version = version
+
+    def _refresh(self):
+        if not self.storage_dir:
+            return
+
+        manifest_path = self._path("manifest.json")
+        for _ in range(3):
+            try:
+                stat = os.stat(manifest_path)
+            except FileNotFoundError:
+                return
+
+            manifest_stat = (stat.st_ino, stat.st_mtime_ns)
+            if manifest_stat == self._manifest_stat:
+                return
+
+            try:
+                with open(manifest_path, encoding="utf-8") as f:
+                    manifest = json.load(f)
+                if manifest["version"] != self._version:
+                    self._load(manifest)
+                self._manifest_stat = manifest_stat
+                return
+            except FileNotFoundError:
+                # Версию удалили между чтением манифеста и файлов - перечитываем
+                continue
+
+
+_PROJECT_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def _with_source(doc: dict, source: str) -> dict:
+    """Копия фрагмента с добавленным источником: записанные версии не меняем на месте."""
+    sources = doc.get("sources", [doc["source"]])
+    if source in sources:
+        return doc
+    return {**doc, "sources": sources + [source]}
+
+
+class IndexRegistry:
+    """Отдельный индекс на каждый проект с LRU-вытеснением.
+
+    Индексы живут в ``<root_dir>/<project_id>``; при превышении бюджета памяти
+    или долгом простое индекс выгружается из процесса и при следующем
+    обращении прозрачно загружается с диска (эмбеддинги - через mmap).
+    """
+
+    def __init__(self, root_dir: str, memory_budget_bytes: int, idle_seconds: float):
+        self.root_dir = Path(root_dir)
+        self.memory_budget_bytes = memory_budget_bytes
+        self.idle_seconds = idle_seconds
+        self._indexes: "OrderedDict[str, DocumentIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def validate_project_id(project_id: str) -> str:
+        if not _PROJECT_ID_RE.match(project_id or ""):
+            raise ValueError(f"Некорректный project_id: {project_id!r}")
+        return project_id
+
+    def exists(self, project_id: str) -> bool:
+        """Есть ли у проекта индекс; в отличие от ``get`` ничего не создает."""
+        self.validate_project_id(project_id)
+        with self._lock:
+            if project_id in self._indexes:
+                return True
+        return (self.root_dir / project_id / "manifest.json").exists()
+
+    def get(self, project_id: str) -> DocumentIndex:
+        self.validate_project_id(project_id)
+        with self._lock:
+            index = self._indexes.get(project_id)
+            if index is None:
+                index = DocumentIndex(self.root_dir / project_id)
+                self._indexes[project_id] = index
+                logger.info(f"Загружен индекс проекта {project_id}")
+            self._indexes.move_to_end(project_id)
+            index.last_access = time.monotonic()
+            self._evict_over_budget(keep=project_id)
+        return index
+
+    def _evict(self, project_id: str) -> bool:
+        index = self._indexes[project_id]
+        if index.has_pending():
+            return False
+        del self._indexes[project_id]
+        logger.info(f"Индекс проекта {project_id} выгружен ({index.memory_bytes()} байт)")
+        return True
+
+    def _evict_over_budget(self, keep: str):
+        total = sum(index.memory_bytes() for index in self._indexes.values())
+        for project_id in list(self._indexes):
+            if total <= self.memory_budget_bytes:
+                break
+            if project_id == keep:
+                continue
+            size = self._indexes[project_id].memory_bytes()
+            if self._evict(project_id):
+                total -= size
+
+    def evict_idle(self) -> int:
+        """Выгружает индексы, к которым не обращались дольше ``idle_seconds``."""
+        now = time.monotonic()
+        evicted = 0
+        with self._lock:
+            for project_id in list(self._indexes):
+                if now - self._indexes[project_id].last_access >= self.idle_seconds:
+                    evicted += self._evict(project_id)
+        return evicted
+
+    def get_stats(self) -> Dict[str, int]:
+        """Только итоги по всем проектам: /health открыт, и список чужих проектов клиентам не отдаем."""
+        with self._lock:
+            indexes = list(self._indexes.items())
         return {
-            "documents_count": len(self.documents),
-            "index_built": self.is_built
+            "loaded_projects": len(indexes),
+            "memory_bytes": sum(index.memory_bytes() for _, index in indexes),
+            "memory_budget_bytes": self.memory_budget_bytes
         }
 
 
-document_index = DocumentIndex()
\ No newline at end of file
+index_registry = IndexRegistry(
+    Path(settings.DATA_DIR) / "indexes",
+    memory_budget_bytes=settings.INDEX_MEMORY_BUDGET_MB * 1024 * 1024,
+    idle_seconds=settings.INDEX_IDLE_SECONDS
+)
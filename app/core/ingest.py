@@ -0,0 +1,117 @@
+"""Пакетная загрузка: распаковка архивов и параллельный разбор файлов.
+
+Модуль не импортирует модели - он же загружается в процессах пула разбора.
+"""
+import asyncio
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import PurePosixPath
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.core.parser import parse_document
+from app.core.resources import governor
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_pid: Optional[int] = None
+
+
+def expand_upload(filename: str, content: bytes) -> List[Tuple[str, bytes]]:
+    """Файлы загрузки: сам файл или содержимое ZIP-архива с путями вида ``архив.zip/папка/файл``."""
+    if not filename.lower().endswith(".zip"):
+        return [(filename, content)]
+
+    limit = settings.UPLOAD_MAX_ARCHIVE_MB * 1024 * 1024
+    total = 0
+    entries = []
+    try:
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            for info in archive.infolist():
+                path = PurePosixPath(info.filename)
+                if info.is_dir() or path.parts[0] == "__MACOSX" or path.name.startswith("."):
+                    continue
+                # Размер из заголовка проверяем до распаковки - защита от zip-бомб
+                total += info.file_size
+                if total > limit:
+                    raise ValueError(f"Архив больше {settings.UPLOAD_MAX_ARCHIVE_MB} МБ после распаковки")
+                entries.append((f"{filename}/{info.filename}", archive.read(info)))
+    except zipfile.BadZipFile as e:
+        raise ValueError(f"Не удалось открыть архив: {e}")
+    return entries
+
+
+def content_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def _parse_worker(filename: str, content: bytes) -> Dict[str, Any]:
+    # Исключения из процесса пула могут не пережить pickle - возвращаем текст ошибки
+    try:
+        return {"filename": filename, "document": parse_document(filename, content)}
+    except Exception as e:
+        return {"filename": filename, "error": str(e)}
+
+
+def _init_parse_process():
+    # Разбор не должен отнимать ядра у генерации: ниже приоритет и один поток BLAS у pandas/numpy
+    if settings.CPU_PARSE_NICE:
+        os.nice(settings.CPU_PARSE_NICE)
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(1)
+    except ImportError:
+        pass
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    """Пул процессов на воркер; spawn, а не fork - процесс с потоками и моделями не форкаем."""
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid():
+        _executor = ProcessPoolExecutor(
+            max_workers=governor.budgets["parse"],
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_parse_process
+        )
+        _executor_pid = os.getpid()
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None and _executor_pid == os.getpid():
+        _executor.shutdown(wait=False, cancel_futures=True)
+    _executor = None
+
+
+async def parse_files(files: List[Tuple[str, bytes]]) -> AsyncIterator[Dict[str, Any]]:
+    """Разбирает файлы параллельно и отдает результаты по мере готовности.
+
+    Каждый результат - ``{"filename", "document"}`` или ``{"filename", "error"}``.
+    """
+    if not files:
+        return
+
+    loop = asyncio.get_running_loop()
+    executor = _get_executor()
+
+    async def parse(name: str, content: bytes) -> Dict[str, Any]:
+        # Пока генерация близка к SLO, новые файлы в пул не отдаем
+        await asyncio.to_thread(governor.ingest_pause)
+        try:
+            with governor.workload("parse"):
+                return await loop.run_in_executor(executor, _parse_worker, name, content)
+        except BrokenProcessPool:
+            # Процесс пула упал (например, по памяти) - следующая загрузка создаст новый пул
+            shutdown_executor()
+            return {"filename": name, "error": "Процесс разбора файла аварийно завершился"}
+
+    for future in asyncio.as_completed([parse(name, content) for name, content in files]):
+        yield await future
@@ -0,0 +1,242 @@
+import math
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Числа (в т.ч. 1,5 / 2024 / 15%), латинские термины (EBITDA, CAPEX) и русские слова
+_TOKEN_RE = re.compile(r"\d+(?:[.,]\d+)*%?|[a-z]+|[а-я]+")
+
+_STOPWORDS = frozenset("""
+и в во не что он на я с со как а то все она так его но да ты к у же вы за бы по только ее мне
+было вот от меня еще нет о из ему теперь когда даже ну вдруг ли если уже или ни быть был него
+до вас нибудь опять уж вам ведь там потом себя ничего ей может они тут где есть надо ней для
+мы тебя их чем была сам чтоб без будто чего раз тоже себе под будет ж тогда кто этот того
+потому этого какой совсем ним здесь этом один почти мой тем чтобы нее сейчас были куда зачем
+всех никогда можно при наконец два об другой хоть после над больше тот через эти нас про всего
+них какая много разве три эту моя впрочем хорошо свою этой перед иногда лучше чуть том нельзя
+такой им более всегда конечно всю между это также
+the a an of and or to in on for is are with by
+""".split())
+
+# --- Стеммер Snowball для русского языка ---
+
+_VOWELS = "аеиоуыэюя"
+
+_PERFECTIVE_GERUND_1 = ("вшись", "вши", "в")
+_PERFECTIVE_GERUND_2 = ("ывшись", "ившись", "ывши", "ивши", "ыв", "ив")
+_ADJECTIVE = (
+    "ими", "ыми", "его", "ого", "ему", "ому", "ее", "ие", "ые", "ое", "ей", "ий", "ый", "ой",
+    "ем", "им", "ым", "ом", "их", "ых", "ую", "юю", "ая", "яя", "ою", "ею"
+)
+_PARTICIPLE_1 = ("ем", "нн", "вш", "ющ", "щ")
+_PARTICIPLE_2 = ("ивш", "ывш", "ующ")
+_REFLEXIVE = ("ся", "сь")
+_VERB_1 = (
+    "ете", "йте", "ешь", "нно", "ла", "на", "ли", "ем", "ло", "но", "ет", "ют", "ны", "ть", "й", "л", "н"
+)
+_VERB_2 = (
+    "ейте", "уйте", "ила", "ыла", "ена", "ите", "или", "ыли", "ило", "ыло", "ено", "ует", "уют",
+    "ены", "ить", "ыть", "ишь", "ей", "уй", "ил", "ыл", "им", "ым", "ен", "ят", "ит", "ыт", "ую", "ю"
+)
+_NOUN = (
+    "иями", "ями", "ами", "ией", "иям", "ием", "иях", "ев", "ов", "ие", "ье", "еи", "ии", "ей", "ой",
+    "ий", "ям", "ем", "ам", "ом", "ах", "ях", "ию", "ью", "ия", "ья", "а", "е", "и", "й", "о", "у",
+    "ы", "ь", "ю", "я"
+)
+_SUPERLATIVE = ("ейше", "ейш")
+_DERIVATIONAL = ("ость", "ост")
+
+
+@lru_cache(maxsize=None)
+def _by_length(endings: Tuple[str, ...]) -> Tuple[str, ...]:
+    return tuple(sorted(endings, key=len, reverse=True))
+
+
+def _strip(word: str, endings: Tuple[str, ...], after_a: Tuple[str, ...] = ()) -> Optional[str]:
+    """Снимает самое длинное окончание; окончания ``after_a`` допустимы только после а/я."""
+    for ending in _by_length(endings + after_a):
+        if word.endswith(ending):
+            stem = word[:-len(ending)]
+            if ending not in endings and not stem.endswith(("а", "я")):
+                continue
+            return stem
+    return None
+
+
+def _region_after_vc(word: str, start: int = 0) -> int:
+    """Позиция после первой пары гласная+согласная начиная со start (R1/R2 Snowball)."""
+    for i in range(start + 1, len(word)):
+        if word[i] not in _VOWELS and word[i - 1] in _VOWELS:
+            return i + 1
+    return len(word)
+
+
+@lru_cache(maxsize=200_000)
+def stem_ru(word: str) -> str:
+    """Русский стеммер Snowball (Porter): снимает окончания в области RV."""
+    rv_start = next((i + 1 for i, ch in enumerate(word) if ch in _VOWELS), len(word))
+    r1 = _region_after_vc(word)
+    r2 = _region_after_vc(word, r1)
+
+    prefix, rv = word[:rv_start], word[rv_start:]
+
+    # Шаг 1
+    stem = _strip(rv, _PERFECTIVE_GERUND_2, _PERFECTIVE_GERUND_1)
+    if stem is not None:
+        rv = stem
+    else:
+        stem = _strip(rv, _REFLEXIVE)
+        if stem is not None:
+            rv = stem
+
+        stem = _strip(rv, _ADJECTIVE)
+        if stem is not None:
+            participle = _strip(stem, _PARTICIPLE_2, _PARTICIPLE_1)
+            rv = participle if participle is not None else stem
+        else:
+            stem = _strip(rv, _VERB_2, _VERB_1)
+            if stem is None:
+                stem = _strip(rv, _NOUN)
+            if stem is not None:
+                rv = stem
+
+    # Шаг 2
+    if rv.endswith("и"):
+        rv = rv[:-1]
+
+    # Шаг 3: словообразовательный суффикс в R2
+    r2_in_rv = max(0, r2 - rv_start)
+    stem = _strip(rv, _DERIVATIONAL)
+    if stem is not None and len(stem) >= r2_in_rv:
+        rv = stem
+
+    # Шаг 4
+    if rv.endswith("нн"):
+        rv = rv[:-1]
+    else:
+        stem = _strip(rv, _SUPERLATIVE)
+        if stem is not None:
+            rv = stem[:-1] if stem.endswith("нн") else stem
+        elif rv.endswith("ь"):
+            rv = rv[:-1]
+
+    return prefix + rv
+
+
+def tokenize(text: str) -> List[str]:
+    """Термы для лексического индекса: нижний регистр, ё→е, без стоп-слов, со стеммингом."""
+    terms = []
+    for token in _TOKEN_RE.findall(text.lower().replace("ё", "е")):
+        if token in _STOPWORDS:
+            continue
+        if "а" <= token[0] <= "я":
+            token = stem_ru(token)
+        terms.append(token)
+    return terms
+
+
+class InvertedIndex:
+    """Инвертированный индекс с ранжированием BM25.
+
+    Постинги хранятся как пары списков (doc_id, tf) в порядке добавления, поэтому
+    стоимость запроса пропорциональна числу постингов его термов, а не размеру корпуса.
+    Для скоринга постинги лениво переводятся в numpy-массивы.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        self.doc_lengths: List[int] = []
+        self.total_length = 0
+        self._arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._lengths: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def add(self, term_counts: Counter) -> int:
+        doc_id = len(self.doc_lengths)
+        for term, tf in term_counts.items():
+            doc_ids, tfs = self.postings.setdefault(term, ([], []))
+            doc_ids.append(doc_id)
+            tfs.append(tf)
+        length = sum(term_counts.values())
+        self.doc_lengths.append(length)
+        self.total_length += length
+
+        self._arrays.clear()
+        self._lengths = None
+        return doc_id
+
+    def _posting_arrays(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            doc_ids, tfs = self.postings[term]
+            arrays = (np.asarray(doc_ids, dtype=np.int64), np.asarray(tfs, dtype=np.float32))
+            self._arrays[term] = arrays
+        return arrays
+
+    def search(self, query: str, limit: int) -> List[Tuple[int, float]]:
+        """До ``limit`` пар (doc_id, bm25) по убыванию оценки."""
+        n_docs = len(self.doc_lengths)
+        if not n_docs:
+            return []
+
+        if self._lengths is None:
+            self._lengths = np.asarray(self.doc_lengths, dtype=np.float32)
+        avg_length = self.total_length / n_docs or 1.0
+
+        id_parts, score_parts = [], []
+        for term in set(tokenize(query)):
+            if term not in self.postings:
+                continue
+            doc_ids, tfs = self._posting_arrays(term)
+            idf = math.log(1 + (n_docs - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_ids] / avg_length)
+            id_parts.append(doc_ids)
+            score_parts.append(idf * tfs * (self.k1 + 1) / (tfs + norm))
+
+        if not id_parts:
+            return []
+
+        doc_ids, scores = np.concatenate(id_parts), np.concatenate(score_parts)
+        if len(id_parts) > 1:
+            doc_ids, inverse = np.unique(doc_ids, return_inverse=True)
+            scores = np.bincount(inverse, weights=scores)
+
+        if len(doc_ids) > limit:
+            top = np.argpartition(scores, -limit)[-limit:]
+            doc_ids, scores = doc_ids[top], scores[top]
+        order = np.argsort(scores)[::-1]
+        return list(zip(doc_ids[order].tolist(), scores[order].tolist()))
+
+    def copy(self) -> "InvertedIndex":
+        other = InvertedIndex(self.k1, self.b)
+        other.postings = {term: (list(ids), list(tfs)) for term, (ids, tfs) in self.postings.items()}
+        other.doc_lengths = list(self.doc_lengths)
+        other.total_length = self.total_length
+        return other
+
+    def memory_bytes(self) -> int:
+        n_postings = sum(len(ids) for ids, _ in self.postings.values())
+        return n_postings * 16 + len(self.postings) * 120 + len(self.doc_lengths) * 8
+
+    def to_dict(self) -> dict:
+        return {
+            "k1": self.k1,
+            "b": self.b,
+            "postings": {term: [ids, tfs] for term, (ids, tfs) in self.postings.items()},
+            "doc_lengths": self.doc_lengths
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "InvertedIndex":
+        index = cls(data["k1"], data["b"])
+        index.postings = {term: (ids, tfs) for term, (ids, tfs) in data["postings"].items()}
+        index.doc_lengths = data["doc_lengths"]
+        index.total_length = sum(index.doc_lengths)
+        return index
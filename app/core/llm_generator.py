@@ -1,6 +1,7 @@
 import torch
 from transformers import pipeline, AutoTokenizer, AutoModelForCausalLM
 from app.config import settings
+from app.core.resources import governor
 import logging
 from typing import Dict, Any
 
@@ -50,7 +51,8 @@ class ContentGenerator:
             raise Exception("Модель не загружена")
 
         prompt = self._create_prompt(slide_type, context, audience)
-        result = self.generator(prompt)[0]['generated_text']
+        with governor.workload("llm"):
+            result = self.generator(prompt)[0]['generated_text']
 
         # Убираем промпт из результата
         content = result.replace(prompt, "").strip()
@@ -119,7 +121,8 @@ class ContentGenerator:
         }
 
         base_prompt = prompts.get(slide_type, "Создай контент для слайда презентации в формате списка с маркерами:")
-        return f"{base_prompt}\n\nКонтекст: {context[:100]}\nАудитория: {audience}"
+        # Контекст уже уложен в бюджет токенов ContextPacker'ом
+        return f"{base_prompt}\n\nКонтекст: {context}\nАудитория: {audience}"
 
     def health_check(self) -> Dict[str, Any]:
         return {
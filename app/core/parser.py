@@ -1,4 +1,5 @@
 from fastapi import UploadFile
+import asyncio
 import io
 import pandas as pd
 from docx import Document
@@ -8,16 +9,24 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+SUPPORTED_EXTENSIONS = (".txt", ".docx", ".pdf", ".xlsx")
+
 
 async def extract_text_from_file(file: UploadFile) -> Dict[str, Any]:
     """Извлекает текст и структурированные данные из файла"""
     content = await file.read()
-    filename = file.filename.lower()
+    # Разбор PDF и Excel занимает секунды - не блокируем event loop
+    return await asyncio.to_thread(parse_document, file.filename, content)
+
+
+def parse_document(original_filename: str, content: bytes) -> Dict[str, Any]:
+    """Разбор содержимого файла; не зависит от FastAPI, поэтому годится для пула процессов"""
+    filename = original_filename.lower()
 
     result = {
         "text": "",
         "tables": [],
-        "metadata": {"filename": file.filename, "type": filename.split('.')[-1]}
+        "metadata": {"filename": original_filename, "type": filename.split('.')[-1]}
     }
 
     try:
@@ -58,7 +67,7 @@ async def extract_text_from_file(file: UploadFile) -> Dict[str, Any]:
 
             # Читаем все листы
             xl = pd.ExcelFile(excel_file)
-            all_text = f"Excel файл: {file.filename}\n"
+            all_text = f"Excel файл: {original_filename}\n"
             all_tables = []
 
             for sheet_name in xl.sheet_names:
@@ -80,10 +89,10 @@ async def extract_text_from_file(file: UploadFile) -> Dict[str, Any]:
             raise ValueError(f"Неподдерживаемый формат файла: {filename}")
 
         logger.info(
-            f"Успешно обработан файл {file.filename}: {len(result['text'])} символов, {len(result['tables'])} таблиц")
+            f"Успешно обработан файл {original_filename}: {len(result['text'])} символов, {len(result['tables'])} таблиц")
         return result
 
     except Exception as e:
-        logger.error(f"Ошибка обработки файла {file.filename}: {e}")
+        logger.error(f"Ошибка обработки файла {original_filename}: {e}")
         raise ValueError(f"Ошибка обработки файла: {str(e)}")
 
@@ -17,6 +17,13 @@ class PresentationBuilder:
             self.prs.slide_width = Inches(13.333)
             self.prs.slide_height = Inches(7.5)
 
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "PresentationBuilder":
+        """Открывает готовую презентацию для точечной правки слайдов."""
+        builder = cls.__new__(cls)
+        builder.prs = Presentation(io.BytesIO(data))
+        return builder
+
     def _clear_slides(self):
         """Очищает все слайды из шаблона - ПРОСТОЙ ВАРИАНТ"""
         try:
@@ -42,6 +49,26 @@ class PresentationBuilder:
         if slide.shapes.title:
             slide.shapes.title.text = title
 
+        self._fill_content(slide, content)
+        return slide
+
+    def replace_slide(self, index: int, title: str, content: str):
+        """Меняет текст одного слайда, остальные слайды и оформление не трогает."""
+        slide = self.prs.slides[index]
+        if slide.shapes.title:
+            slide.shapes.title.text = title
+        self._fill_content(slide, content)
+        return slide
+
+    @staticmethod
+    def _content_textbox(slide):
+        """Текстовое поле, добавленное ``_fill_content`` для макета без плейсхолдера."""
+        for shape in slide.shapes:
+            if shape.has_text_frame and not shape.is_placeholder:
+                return shape
+        return None
+
+    def _fill_content(self, slide, content: str):
         # Контент с улучшенным форматированием
         try:
             if len(slide.placeholders) > 1:
@@ -55,13 +82,15 @@ class PresentationBuilder:
                     paragraph.alignment = PP_ALIGN.LEFT
 
             else:
-                # Создаем текстовое поле с правильными размерами
-                left = Inches(1)
-                top = Inches(2)
-                width = Inches(11)
-                height = Inches(4)
-
-                textbox = slide.shapes.add_textbox(left, top, width, height)
+                textbox = self._content_textbox(slide)
+                if textbox is None:
+                    # Создаем текстовое поле с правильными размерами
+                    left = Inches(1)
+                    top = Inches(2)
+                    width = Inches(11)
+                    height = Inches(4)
+
+                    textbox = slide.shapes.add_textbox(left, top, width, height)
                 text_frame = textbox.text_frame
                 text_frame.text = content
 
@@ -73,8 +102,6 @@ class PresentationBuilder:
         except Exception as e:
             logger.warning(f"Не удалось добавить контент: {e}")
 
-        return slide
-
     def save_to_bytes(self) -> io.BytesIO:
         bytes_io = io.BytesIO()
         self.prs.save(bytes_io)
@@ -0,0 +1,210 @@
+"""Распределение CPU воркера между генерацией, эмбеддингами и разбором файлов.
+
+LLM, эмбеддер и разбор PDF/Excel работают в одном процессе и по умолчанию
+каждый занимает все ядра - при большой загрузке генерация заметно замедляется.
+Губернатор дает каждому классу нагрузки свой бюджет: потоки torch для LLM и
+эмбеддера, процессы пула для разбора. Пока работает только один класс, он
+получает все ядра воркера. Генерация в приоритете и при соседях берет свой
+бюджет; остальные берут не больше ядер, чем не заняли соседи, и пересчитывают
+потоки на каждом батче; нагрузки одного класса делят его долю поровну. Если генерация рискует не уложиться в SLO на слайд,
+загрузка документов приостанавливается между батчами.
+
+У torch с бэкендом OpenMP число потоков задается на поток ОС, поэтому
+``torch.set_num_threads`` в начале нагрузки не мешает параллельной нагрузке
+другого класса.
+"""
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+WORKLOADS = ("llm", "embedding", "parse")
+
+# Нагрузки, которые считаются в потоках torch текущего процесса
+_TORCH_WORKLOADS = ("llm", "embedding")
+
+# Вес нового замера в скользящей оценке задержки генерации слайда
+_LATENCY_ALPHA = 0.3
+
+_PAUSE_STEP_SECONDS = 0.05
+
+
+def worker_cores() -> int:
+    """Ядра одного воркера: WORKER_THREADS или поровну доступных процессу ядер."""
+    if settings.WORKER_THREADS > 0:
+        return settings.WORKER_THREADS
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cores = os.cpu_count() or 1
+    return max(1, cores // max(1, settings.WORKERS))
+
+
+def _set_torch_threads(threads: int):
+    try:
+        import torch
+    except ImportError:
+        return
+    if torch.get_num_threads() != threads:
+        torch.set_num_threads(threads)
+
+
+class Workload:
+    """Одна выполняющаяся нагрузка: класс и число потоков, которое она сейчас держит.
+
+    Счетчик живет в самом объекте, а не в потоке ОС: несколько нагрузок
+    одного класса могут идти корутинами в одном потоке цикла событий.
+    """
+
+    __slots__ = ("name", "threads")
+
+    def __init__(self, name: str, threads: int):
+        self.name = name
+        self.threads = threads
+
+
+class ResourceGovernor:
+    """Бюджеты CPU по классам нагрузки и притормаживание загрузки ради генерации."""
+
+    def __init__(self, cores: int):
+        self.cores = cores
+        # Генерация - путь с требованием к задержке, ей большая часть ядер
+        self.budgets = {
+            "llm": settings.CPU_LLM_THREADS or max(1, cores - cores // 4),
+            "embedding": settings.CPU_EMBEDDING_THREADS or max(1, cores // 4),
+            "parse": settings.UPLOAD_PARSE_WORKERS or max(1, cores // 4)
+        }
+        self._lock = threading.Lock()
+        self._active = {name: 0 for name in WORKLOADS}
+        self._threads = {name: 0 for name in WORKLOADS}
+        # Потоки, занятые сейчас всеми активными нагрузками класса
+        self._held = {name: 0 for name in WORKLOADS}
+        self._completed = {name: 0 for name in WORKLOADS}
+        self._busy_seconds = {name: 0.0 for name in WORKLOADS}
+        self._slide_latency = None
+        self._pauses = 0
+        self._paused_seconds = 0.0
+
+    def _threads_locked(self, name: str, own: Optional[Workload] = None) -> int:
+        """Потоки для новой нагрузки класса ``name`` (или для ``own`` при пересчете)."""
+        if name == "parse":
+            # Файл разбирается одним процессом пула фиксированного размера
+            return 1
+
+        active, held = dict(self._active), dict(self._held)
+        if own is not None:
+            active[name] -= 1
+            held[name] -= own.threads
+        # Разбор не занимает больше процессов, чем есть в пуле
+        held["parse"] = min(held["parse"], self.budgets["parse"])
+
+        others = any(count for other, count in active.items() if other != name)
+        limit = self.budgets[name] if others else self.cores
+        # Одновременные нагрузки одного класса делят его долю поровну
+        share = max(1, limit // (active[name] + 1))
+        if name == "llm":
+            # Генерация в приоритете: соседи других классов уступят ей на следующем батче
+            return share
+        free = self.cores - sum(held[other] for other in WORKLOADS if other != name)
+        return max(1, min(share, free))
+
+    def threads_for(self, name: str) -> int:
+        """Потоки, которые сейчас получила бы новая нагрузка класса ``name``."""
+        with self._lock:
+            return self._threads_locked(name)
+
+    @contextmanager
+    def workload(self, name: str) -> Iterator[Workload]:
+        # Выбор потоков и учет нагрузки - под одной блокировкой, иначе две
+        # одновременно стартовавшие нагрузки обе видят простой и берут все ядра
+        with self._lock:
+            current = Workload(name, self._threads_locked(name))
+            self._active[name] += 1
+            self._threads[name] = current.threads
+            self._held[name] += current.threads
+        if name in _TORCH_WORKLOADS:
+            _set_torch_threads(current.threads)
+
+        started = time.perf_counter()
+        try:
+            yield current
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._active[name] -= 1
+                self._held[name] -= current.threads
+                self._completed[name] += 1
+                self._busy_seconds[name] += elapsed
+                if name == "llm":
+                    # Один вызов LLM - один слайд
+                    if self._slide_latency is None:
+                        self._slide_latency = elapsed
+                    else:
+                        self._slide_latency += _LATENCY_ALPHA * (elapsed - self._slide_latency)
+
+    def retune(self, current: Workload) -> int:
+        """Пересчитывает потоки выполняющейся нагрузки под нынешних соседей.
+
+        Вызывается между батчами длинной нагрузки: если генерация началась
+        посреди загрузки, эмбеддер уступает ей ядра уже на следующем батче.
+        """
+        with self._lock:
+            threads = self._threads_locked(current.name, own=current)
+            self._held[current.name] += threads - current.threads
+            self._threads[current.name] = threads
+        changed, current.threads = threads != current.threads, threads
+        if changed and current.name in _TORCH_WORKLOADS:
+            _set_torch_threads(threads)
+        return threads
+
+    def generation_at_risk(self) -> bool:
+        with self._lock:
+            return (self._active["llm"] > 0 and self._slide_latency is not None
+                    and self._slide_latency > settings.GENERATION_SLIDE_SLO_SECONDS * settings.INGEST_THROTTLE_RATIO)
+
+    def ingest_pause(self) -> float:
+        """Ждет, пока генерация рискует выйти за SLO, но не дольше INGEST_MAX_PAUSE_SECONDS.
+
+        Вызывается загрузкой между батчами; возвращает время ожидания.
+        """
+        if not settings.INGEST_THROTTLE or not self.generation_at_risk():
+            return 0.0
+
+        started = time.perf_counter()
+        deadline = started + settings.INGEST_MAX_PAUSE_SECONDS
+        while time.perf_counter() < deadline and self.generation_at_risk():
+            time.sleep(_PAUSE_STEP_SECONDS)
+        paused = time.perf_counter() - started
+
+        with self._lock:
+            self._pauses += 1
+            self._paused_seconds += paused
+        logger.info(f"⏸ Загрузка приостановлена на {paused:.2f} с: генерация близка к SLO")
+        return paused
+
+    def stats(self) -> Dict[str, Any]:
+        at_risk = self.generation_at_risk()
+        with self._lock:
+            return {
+                "cores": self.cores,
+                "budgets": dict(self.budgets),
+                "active": dict(self._active),
+                "held_threads": dict(self._held),
+                "last_threads": dict(self._threads),
+                "completed": dict(self._completed),
+                "busy_seconds": {name: round(value, 3) for name, value in self._busy_seconds.items()},
+                "slide_latency_seconds": None if self._slide_latency is None else round(self._slide_latency, 3),
+                "slide_slo_seconds": settings.GENERATION_SLIDE_SLO_SECONDS,
+                "generation_at_risk": at_risk,
+                "ingest_pauses": self._pauses,
+                "ingest_paused_seconds": round(self._paused_seconds, 3)
+            }
+
+
+governor = ResourceGovernor(worker_cores())
@@ -0,0 +1,373 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SQLiteStore:
+    """Общая база для хранилищ: WAL-режим, отдельное соединение на поток и процесс.
+
+    Соединения не переживают fork, поэтому при смене pid открывается новое.
+    """
+
+    SCHEMA = ""
+    # Колонки, добавленные после первой версии схемы: {таблица: {колонка: определение}}
+    ADDED_COLUMNS: Dict[str, Dict[str, str]] = {}
+
+    def __init__(self, db_path: str):
+        self.db_path = str(db_path)
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(self.SCHEMA)
+        self._migrate(conn)
+
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _migrate(self, conn: sqlite3.Connection):
+        for table, columns in self.ADDED_COLUMNS.items():
+            existing = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+            for column, definition in columns.items():
+                if column not in existing:
+                    try:
+                        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+                    except sqlite3.OperationalError as e:
+                        # Другой воркер успел добавить колонку первым
+                        if "duplicate column" not in str(e):
+                            raise
+
+
+def _process_start(pid: int) -> Optional[str]:
+    """Время запуска процесса (в тиках с загрузки ОС) из /proc; None, если /proc нет."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # Имя процесса в скобках может содержать пробелы - считаем поля после него
+    return stat[stat.rindex(")") + 2:].split()[19]
+
+
+# Метка запуска для каждого pid: после fork у воркера своя
+_boot_marks: Dict[int, str] = {}
+
+
+def worker_id() -> str:
+    """Идентификатор текущего процесса: хост, pid и метка запуска.
+
+    Метка отличает процесс от предыдущего запуска с тем же pid - перезапущенный
+    контейнер сохраняет имя хоста и часто получает те же pid.
+    """
+    pid = os.getpid()
+    mark = _boot_marks.get(pid)
+    if mark is None:
+        mark = _boot_marks[pid] = _process_start(pid) or uuid.uuid4().hex[:12]
+    return f"{socket.gethostname()}:{pid}:{mark}"
+
+
+# lease_until задачи, отданной воркером при плавной остановке
+RELEASED_LEASE = 0
+
+
+def _owner_alive(owner: Optional[str]) -> bool:
+    """Жив ли процесс-владелец задачи; про другие хосты знаем только по аренде."""
+    if not owner:
+        return False
+    if owner == worker_id():
+        return True
+    host, pid, mark = (owner.split(":") + ["", ""])[:3]
+    if host != socket.gethostname():
+        return True
+    try:
+        pid = int(pid)
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, ValueError):
+        return True
+    if pid == os.getpid():
+        # Наш pid, но метка другая - владельцем был прошлый запуск
+        return False
+    # Тот же pid может занимать уже другой процесс
+    started = _process_start(pid)
+    return started is None or not mark or started == mark
+
+
+class JobStore(SQLiteStore):
+    """Статусы задач генерации, общие для всех воркеров.
+
+    Задачу выполняет воркер, взявший ее в аренду (``worker_id``, ``lease_until``).
+    Пока идет генерация, аренда продлевается в фоне; если владелец умер или аренда
+    истекла, задачу забирает другой воркер и продолжает с последнего готового слайда.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS jobs (
+        job_id TEXT PRIMARY KEY,
+        status TEXT NOT NULL,
+        progress INTEGER NOT NULL DEFAULT 0,
+        slides_generated TEXT NOT NULL DEFAULT '[]',
+        slides_count INTEGER NOT NULL DEFAULT 0,
+        error_message TEXT,
+        created_at TEXT,
+        updated_at TEXT,
+        presentation_filename TEXT,
+        presentation_data BLOB,
+        request TEXT NOT NULL DEFAULT '{}',
+        worker_id TEXT,
+        lease_until REAL,
+        attempts INTEGER NOT NULL DEFAULT 0
+    );
+    """
+    ADDED_COLUMNS = {"jobs": {
+        "request": "TEXT NOT NULL DEFAULT '{}'",
+        "worker_id": "TEXT",
+        "lease_until": "REAL",
+        "attempts": "INTEGER NOT NULL DEFAULT 0"
+    }}
+
+    COLUMNS = (
+        "job_id", "status", "progress", "slides_generated", "slides_count", "error_message",
+        "created_at", "updated_at", "presentation_filename", "presentation_data", "request",
+        "worker_id", "lease_until", "attempts"
+    )
+    UNFINISHED = ("pending", "processing")
+    JSON_COLUMNS = {"slides_generated", "request"}
+
+    def _encode(self, fields: Dict[str, Any]) -> Dict[str, Any]:
+        unknown = set(fields) - set(self.COLUMNS)
+        if unknown:
+            raise ValueError(f"Неизвестные поля задачи: {', '.join(sorted(unknown))}")
+        return {
+            key: json.dumps(value, ensure_ascii=False) if key in self.JSON_COLUMNS else value
+            for key, value in fields.items()
+        }
+
+    def _decode(self, row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        for key in self.JSON_COLUMNS & job.keys():
+            job[key] = json.loads(job[key])
+        return job
+
+    def create(self, job: Dict[str, Any]):
+        fields = self._encode(job)
+        columns = ", ".join(fields)
+        placeholders = ", ".join(f":{key}" for key in fields)
+        self._connect().execute(f"INSERT INTO jobs ({columns}) VALUES ({placeholders})", fields)
+
+    def get(self, job_id: str, with_data: bool = False) -> Optional[Dict[str, Any]]:
+        columns = self.COLUMNS if with_data else tuple(c for c in self.COLUMNS if c != "presentation_data")
+        row = self._connect().execute(
+            f"SELECT {', '.join(columns)} FROM jobs WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        return self._decode(row) if row else None
+
+    def update(self, job_id: str, **fields):
+        fields["updated_at"] = datetime.now().isoformat()
+        encoded = self._encode(fields)
+        assignments = ", ".join(f"{key} = :{key}" for key in encoded)
+        encoded["_job_id"] = job_id
+        self._connect().execute(f"UPDATE jobs SET {assignments} WHERE job_id = :_job_id", encoded)
+
+    def update_owned(self, job_id: str, **fields) -> bool:
+        """Как ``update``, но только пока задача у этого воркера; False - ее забрал другой."""
+        fields["updated_at"] = datetime.now().isoformat()
+        encoded = self._encode(fields)
+        assignments = ", ".join(f"{key} = :{key}" for key in encoded)
+        encoded["_job_id"] = job_id
+        encoded["_worker_id"] = worker_id()
+        cursor = self._connect().execute(
+            f"UPDATE jobs SET {assignments} WHERE job_id = :_job_id AND worker_id = :_worker_id", encoded
+        )
+        return cursor.rowcount == 1
+
+    def append_slide(self, job_id: str, slide: Dict[str, Any]) -> bool:
+        """Дописывает готовый слайд; False, если задачу уже забрал другой воркер."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT slides_generated FROM jobs WHERE job_id = ? AND worker_id = ?", (job_id, worker_id())
+            ).fetchone()
+            if row is None:
+                conn.execute("ROLLBACK")
+                return False
+            slides = json.loads(row["slides_generated"])
+            slides.append(slide)
+            conn.execute(
+                "UPDATE jobs SET slides_generated = ?, updated_at = ? WHERE job_id = ?",
+                (json.dumps(slides, ensure_ascii=False), datetime.now().isoformat(), job_id)
+            )
+            conn.execute("COMMIT")
+            return True
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def replace_slide(self, job_id: str, index: int, slide: Dict[str, Any],
+                      patch: Callable[[bytes], bytes]) -> bool:
+        """Заменяет слайд ``index`` и пересобирает файл через ``patch`` в одной транзакции.
+
+        Так две правки разных слайдов одной презентации не затирают друг друга.
+        Возвращает False, если задачи или слайда уже нет.
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT slides_generated, presentation_data FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+            slides = json.loads(row["slides_generated"]) if row else []
+            if not 0 <= index < len(slides) or row["presentation_data"] is None:
+                conn.execute("ROLLBACK")
+                return False
+
+            slides[index] = slide
+            conn.execute(
+                "UPDATE jobs SET slides_generated = ?, presentation_data = ?, updated_at = ? WHERE job_id = ?",
+                (json.dumps(slides, ensure_ascii=False), patch(row["presentation_data"]),
+                 datetime.now().isoformat(), job_id)
+            )
+            conn.execute("COMMIT")
+            return True
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    # --- Аренда задач ---
+
+    def renew_lease(self, job_id: str) -> bool:
+        """Продлевает аренду; False, если задачу уже забрал другой воркер или она отдана."""
+        cursor = self._connect().execute(
+            "UPDATE jobs SET lease_until = ? WHERE job_id = ? AND worker_id = ? AND lease_until > ?",
+            (time.time() + settings.JOB_LEASE_SECONDS, job_id, worker_id(), RELEASED_LEASE)
+        )
+        return cursor.rowcount == 1
+
+    def release_lease(self, job_id: str):
+        """Отдает задачу сразу, не дожидаясь истечения аренды (плавная остановка).
+
+        Отданная задача при следующем захвате не считается прерванной попыткой.
+        """
+        self._connect().execute(
+            "UPDATE jobs SET lease_until = ? WHERE job_id = ? AND worker_id = ?",
+            (RELEASED_LEASE, job_id, worker_id())
+        )
+
+    @staticmethod
+    def interrupted(job: Dict[str, Any]) -> bool:
+        """Задача из ``orphaned()`` брошена аварийно (владелец умер или не продлил аренду),
+        а не отдана при остановке."""
+        return job["lease_until"] != RELEASED_LEASE
+
+    def orphaned(self) -> List[Dict[str, Any]]:
+        """Незавершенные задачи, чей владелец умер или не продлил аренду."""
+        placeholders = ", ".join("?" for _ in self.UNFINISHED)
+        rows = self._connect().execute(
+            f"SELECT job_id, worker_id, lease_until, attempts, request FROM jobs "
+            f"WHERE status IN ({placeholders}) ORDER BY created_at",
+            self.UNFINISHED
+        ).fetchall()
+        now = time.time()
+        return [
+            self._decode(row) for row in rows
+            if (row["lease_until"] or 0) < now or not _owner_alive(row["worker_id"])
+        ]
+
+    def claim(self, job: Dict[str, Any]) -> bool:
+        """Забирает задачу из ``orphaned()``; сравнение с прочитанными значениями
+        гарантирует, что из нескольких воркеров задачу получит один."""
+        cursor = self._connect().execute(
+            "UPDATE jobs SET worker_id = ?, lease_until = ?, attempts = attempts + ?, updated_at = ? "
+            "WHERE job_id = ? AND worker_id IS ? AND lease_until IS ?",
+            (worker_id(), time.time() + settings.JOB_LEASE_SECONDS, int(self.interrupted(job)),
+             datetime.now().isoformat(), job["job_id"], job["worker_id"], job["lease_until"])
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, job_id: str):
+        self._connect().execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+
+    def count(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+    def __contains__(self, job_id: str) -> bool:
+        return self._connect().execute(
+            "SELECT 1 FROM jobs WHERE job_id = ?", (job_id,)
+        ).fetchone() is not None
+
+
+class TemplateStore(SQLiteStore):
+    """Метаданные загруженных шаблонов; сами .pptx лежат в TEMPLATES_DIR."""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS templates (
+        id TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        filename TEXT NOT NULL,
+        file_path TEXT NOT NULL,
+        slides_count INTEGER NOT NULL DEFAULT 0,
+        layouts TEXT NOT NULL DEFAULT '[]',
+        created_at TEXT
+    );
+    """
+
+    def _decode(self, row: sqlite3.Row) -> Dict[str, Any]:
+        template = dict(row)
+        template["layouts"] = json.loads(template["layouts"])
+        template.pop("created_at", None)
+        return template
+
+    def add(self, template: Dict[str, Any]):
+        self._connect().execute(
+            "INSERT INTO templates (id, name, filename, file_path, slides_count, layouts, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                template["id"], template["name"], template["filename"], template["file_path"],
+                template["slides_count"], json.dumps(template["layouts"], ensure_ascii=False),
+                datetime.now().isoformat()
+            )
+        )
+
+    def get(self, template_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute("SELECT * FROM templates WHERE id = ?", (template_id,)).fetchone()
+        return self._decode(row) if row else None
+
+    def list(self) -> List[Dict[str, Any]]:
+        rows = self._connect().execute("SELECT * FROM templates ORDER BY created_at").fetchall()
+        return [self._decode(row) for row in rows]
+
+    def delete(self, template_id: str):
+        self._connect().execute("DELETE FROM templates WHERE id = ?", (template_id,))
+
+    def __contains__(self, template_id: str) -> bool:
+        return self._connect().execute(
+            "SELECT 1 FROM templates WHERE id = ?", (template_id,)
+        ).fetchone() is not None
+
+
+_db_path = Path(settings.DATA_DIR) / "app.db"
+job_store = JobStore(_db_path)
+templates_store = TemplateStore(_db_path)
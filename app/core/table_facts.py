@@ -0,0 +1,263 @@
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Заголовки периодов: 2024, 2024 г., 2025П, FY2023, 2026E, 2024 план
+_YEAR_RE = re.compile(
+    r"^(?:fy\s*)?((?:19|20)\d{2})(?:\.0)?\s*(?:г\.?|год|[пфef]|план|прогноз|факт)?$", re.IGNORECASE
+)
+_THOUSANDS_RE = re.compile(r"^-?\d{1,3}(?:,\d{3})+(?:\.\d+)?$")
+_TRAILING_UNITS_RE = re.compile(r"(?:[\s₽$€%]|руб\.?|р\.|млн\.?|млрд\.?|тыс\.?)*$", re.IGNORECASE)
+
+# Метрика: (регулярное выражение по названию строки/колонки, поток ли это за период).
+# Порядок важен: себестоимость и расходы («Расходы на продажи») проверяются раньше выручки,
+# капзатраты раньше прочих затрат, рентабельность раньше самой метрики, EBITDA раньше EBIT,
+# прибыль от продаж, валовая и операционная прибыль раньше просто прибыли.
+METRICS: Dict[str, Tuple[re.Pattern, bool]] = {
+    "margin": (re.compile(r"рентабельн|маржинальн|margin"), False),
+    "capex": (re.compile(r"capex|капзатрат|капитальн\w* (?:затрат|вложен|расход)|капвложен"), True),
+    "investment": (re.compile(r"инвестиц|investment|финансирован"), True),
+    "opex": (re.compile(r"opex|себестоимост|издержк|\bрасход|\bзатрат|expenses|\bcosts?\b"), True),
+    "gross_profit": (re.compile(r"валов|gross"), True),
+    "ebitda": (re.compile(r"ebitda"), True),
+    "operating_profit": (re.compile(
+        r"операционная прибыль|прибыль (?:\(убыток\) )?от продаж|\bebit\b|operating (?:profit|income)"), True),
+    "net_income": (re.compile(r"чистая прибыль|net (?:income|profit)|прибыль|убыток"), True),
+    "revenue": (re.compile(
+        r"выручк|revenue|\bsales\b|\b(?:товаро)?оборот\b|\bдоход\b|доходы от (?:продаж|реализац|основн)"), True),
+    "cash_flow": (re.compile(r"денежн\w* поток|cash ?flow|\bfcf\b"), True),
+    "market_share": (re.compile(r"доля рынка|market share"), False),
+    "market_size": (re.compile(r"объ[её]м рынка|\bрын[оак]|market|\btam\b|\bsam\b|\bsom\b"), False),
+    "customers": (re.compile(r"клиент|пользовател|абонент|подписчик|customers|users"), False),
+}
+
+# Какие метрики и в каком порядке попадают в контекст слайда
+SLIDE_METRICS: Dict[str, Tuple[str, ...]] = {
+    "finance": ("revenue", "ebitda", "net_income", "margin", "gross_profit", "operating_profit",
+                "cash_flow", "capex", "opex", "investment"),
+    "market": ("market_size", "market_share", "customers", "revenue"),
+}
+
+
+def _year(cell: Any) -> Optional[int]:
+    match = _YEAR_RE.match(str(cell).strip()) if cell is not None else None
+    return int(match.group(1)) if match else None
+
+
+def parse_number(cell: Any) -> Optional[Tuple[float, bool]]:
+    """Число из ячейки и признак процента: '1 234,5', '(120)', '12%', '3.4 млн руб.'."""
+    if cell is None or isinstance(cell, bool):
+        return None
+    if isinstance(cell, (int, float)):
+        return (float(cell), False) if cell == cell else None
+
+    text = str(cell).strip().replace("\u00a0", " ").replace("−", "-").replace("–", "-")
+    if not text:
+        return None
+    percent = "%" in text
+    negative = text.startswith("(") and text.endswith(")")
+    text = _TRAILING_UNITS_RE.sub("", text.strip("()")).replace(" ", "")
+
+    if _THOUSANDS_RE.match(text):
+        text = text.replace(",", "")
+    else:
+        text = text.replace(",", ".")
+    try:
+        value = float(text)
+    except ValueError:
+        return None
+    return (-value if negative else value), percent
+
+
+def detect_metric(label: str) -> Optional[str]:
+    label = label.lower().replace("ё", "е")
+    for metric, (pattern, _) in METRICS.items():
+        if pattern.search(label):
+            return metric
+    return None
+
+
+def _table_rows(table: Any) -> Tuple[str, List[List[Any]]]:
+    """Таблица парсера в виде (имя, строки): Excel-лист - словарь, DOCX/PDF - список строк."""
+    if isinstance(table, dict):
+        return str(table.get("sheet_name", "")), [list(table.get("columns", []))] + list(table.get("data", []))
+    return "", [list(row) for row in table]
+
+
+def _label(row: Sequence[Any], skip: Sequence[int]) -> str:
+    for j, cell in enumerate(row):
+        if j in skip or cell is None:
+            continue
+        text = str(cell).strip()
+        if text and parse_number(text) is None:
+            return text
+    return ""
+
+
+def _series(label: str, points: Dict[int, Tuple[float, bool]], source: str, table: str) -> Optional[dict]:
+    metric = detect_metric(label)
+    if metric is None or not points:
+        return None
+
+    years = sorted(points)
+    values = [points[year][0] for year in years]
+    percent = any(points[year][1] for year in years)
+    flow = METRICS[metric][1]
+
+    series = {
+        "metric": metric,
+        "label": label[:60],
+        "source": source,
+        "table": table,
+        "years": years,
+        "values": values,
+        "percent": percent,
+        "yoy": None,
+        "cagr": None,
+        "total": None
+    }
+    if len(years) >= 2:
+        previous, latest = values[-2], values[-1]
+        if percent:
+            series["yoy"] = latest - previous
+        elif previous > 0:
+            series["yoy"] = latest / previous - 1
+
+        span = years[-1] - years[0]
+        if not percent and span >= 2 and values[0] > 0 and latest > 0:
+            series["cagr"] = (latest / values[0]) ** (1 / span) - 1
+        if flow and not percent:
+            series["total"] = sum(values)
+    return series
+
+
+def extract_series(table: Any, source: str) -> List[dict]:
+    """Ряды метрик по годам из таблицы в любой из двух ориентаций.
+
+    Годы в строке заголовка (ищется в первых строках) - метрики идут строками;
+    годы в колонке - метрики идут колонками с названиями в первой строке.
+    """
+    name, rows = _table_rows(table)
+    rows = [row for row in rows if any(cell not in (None, "") for cell in row)]
+    if len(rows) < 2:
+        return []
+
+    result = []
+    for h, header in enumerate(rows[:5]):
+        year_columns = {j: year for j, cell in enumerate(header) if (year := _year(cell))}
+        if len(year_columns) < 2:
+            continue
+        for row in rows[h + 1:]:
+            points = {}
+            for j, year in year_columns.items():
+                number = parse_number(row[j]) if j < len(row) else None
+                if number is not None and year not in points:
+                    points[year] = number
+            series = _series(_label(row, list(year_columns)), points, source, name)
+            if series:
+                result.append(series)
+        return result
+
+    header = rows[0]
+    width = max(len(row) for row in rows)
+    for j in range(width):
+        year_rows = {i: year for i, row in enumerate(rows[1:], 1) if j < len(row) and (year := _year(row[j]))}
+        if len(year_rows) < 2:
+            continue
+        for k in range(width):
+            if k == j or k >= len(header) or header[k] is None:
+                continue
+            points = {}
+            for i, year in year_rows.items():
+                number = parse_number(rows[i][k]) if k < len(rows[i]) else None
+                if number is not None and year not in points:
+                    points[year] = number
+            series = _series(str(header[k]).strip(), points, source, name)
+            if series:
+                result.append(series)
+        return result
+    return result
+
+
+def _format_number(value: float) -> str:
+    if abs(value) >= 100:
+        return f"{value:,.0f}".replace(",", " ")
+    return f"{value:.1f}".rstrip("0").rstrip(".").replace(".", ",")
+
+
+def format_fact(series: dict) -> str:
+    """Одна строка с посчитанными показателями ряда - несколько десятков токенов."""
+    years, values = series["years"], series["values"]
+    suffix = "%" if series["percent"] else ""
+    parts = [f"{series['label']}: {years[-1]} - {_format_number(values[-1])}{suffix}"]
+    if series["yoy"] is not None:
+        if series["percent"]:
+            parts.append(f"{series['yoy']:+.1f} п.п. к {years[-2]}".replace(".", ",", 1))
+        else:
+            parts.append(f"{series['yoy'] * 100:+.0f}% к {years[-2]}")
+    if series["cagr"] is not None:
+        parts.append(f"CAGR {years[0]}-{years[-1]} {series['cagr'] * 100:+.0f}%")
+    if series["total"] is not None:
+        parts.append(f"сумма за {years[0]}-{years[-1]} - {_format_number(series['total'])}")
+    return "; ".join(parts)
+
+
+class TableStore:
+    """Ряды метрик из таблиц документов в колоночном виде.
+
+    Показатели (динамика, CAGR, сумма, последнее значение) считаются при
+    загрузке, поэтому при генерации слайда остается только выбрать строки.
+    """
+
+    FIELDS = ("metric", "label", "source", "table", "years", "values", "percent", "yoy", "cagr", "total")
+
+    def __init__(self):
+        self.columns: Dict[str, list] = {field: [] for field in self.FIELDS}
+
+    def __len__(self) -> int:
+        return len(self.columns["metric"])
+
+    def add(self, series: List[dict]):
+        for item in series:
+            for field in self.FIELDS:
+                self.columns[field].append(item[field])
+
+    def rows(self) -> List[dict]:
+        return [dict(zip(self.FIELDS, values)) for values in zip(*(self.columns[f] for f in self.FIELDS))]
+
+    def facts(self, slide_type: str, limit: int) -> List[str]:
+        """До ``limit`` фактов для слайда: метрики по приоритету, свежие периоды раньше."""
+        priority = {metric: i for i, metric in enumerate(SLIDE_METRICS.get(slide_type, ()))}
+        if not priority:
+            return []
+
+        candidates = [row for row in self.rows() if row["metric"] in priority]
+        candidates.sort(key=lambda row: (priority[row["metric"]], -row["years"][-1], -len(row["years"])))
+
+        facts, seen = [], set()
+        for row in candidates:
+            # Одна и та же таблица часто лежит в нескольких файлах
+            key = (row["metric"], tuple(row["years"]), tuple(row["values"]))
+            if key in seen:
+                continue
+            seen.add(key)
+            facts.append(format_fact(row))
+            if len(facts) >= limit:
+                break
+        return facts
+
+    def copy(self) -> "TableStore":
+        other = TableStore()
+        other.columns = {field: list(values) for field, values in self.columns.items()}
+        return other
+
+    def memory_bytes(self) -> int:
+        return sum(len(row["years"]) * 16 + len(row["label"]) * 2 + 200 for row in self.rows())
+
+    def to_dict(self) -> dict:
+        return self.columns
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "TableStore":
+        store = cls()
+        store.columns = {field: data.get(field, []) for field in cls.FIELDS}
+        return store
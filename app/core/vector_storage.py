@@ -0,0 +1,75 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+STORAGE_DTYPES = ("float32", "float16", "int8")
+
+# Блок в несколько мегабайт помещается в кэш при переводе во float32
+_BLOCK_ROWS = 4096
+
+
+def quantize(embeddings: np.ndarray, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Переводит нормированные float32-векторы в формат хранения.
+
+    int8 квантуется симметрично с отдельным масштабом на вектор,
+    возвращается пара (матрица, масштабы); для float-форматов масштабов нет.
+    """
+    if dtype == "float32":
+        return np.ascontiguousarray(embeddings, dtype=np.float32), None
+    if dtype == "float16":
+        return embeddings.astype(np.float16), None
+    if dtype == "int8":
+        scales = np.abs(embeddings).max(axis=1) / 127.0
+        scales = np.maximum(scales, 1e-12).astype(np.float32)
+        quantized = np.clip(np.rint(embeddings / scales[:, None]), -127, 127).astype(np.int8)
+        return quantized, scales
+    raise ValueError(f"Неизвестный формат хранения векторов: {dtype}. Доступны: {', '.join(STORAGE_DTYPES)}")
+
+
+def dequantize(matrix: np.ndarray, scales: Optional[np.ndarray]) -> np.ndarray:
+    result = np.asarray(matrix, dtype=np.float32)
+    if scales is not None:
+        result = result * scales[:, None]
+    return result
+
+
+def dot_scores(matrix: np.ndarray, scales: Optional[np.ndarray], query: np.ndarray) -> np.ndarray:
+    """Скалярные произведения строк с запросом; не-float32 матрицы обрабатываются блоками."""
+    if matrix.dtype == np.float32:
+        scores = matrix @ query
+    else:
+        scores = np.empty(len(matrix), dtype=np.float32)
+        for start in range(0, len(matrix), _BLOCK_ROWS):
+            block = matrix[start:start + _BLOCK_ROWS]
+            scores[start:start + len(block)] = block.astype(np.float32) @ query
+    if scales is not None:
+        scores = scores * scales
+    return scores
+
+
+def recall_at_k(reference: np.ndarray, dtype: str, k: int = 10, n_queries: int = 100,
+                sample_size: int = 5000, seed: int = 0) -> float:
+    """Доля top-k соседей по fp32, которые находятся и после перевода в ``dtype``.
+
+    Запросы откладываются из выборки и в поиске не участвуют: иначе каждый
+    запрос находит сам себя в обоих форматах и одно из k мест всегда
+    засчитывается. Поиск идет по случайной выборке до ``sample_size``
+    остальных векторов.
+    """
+    if len(reference) <= 1:
+        return 1.0
+
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(reference))
+    n_queries = max(1, min(n_queries, len(reference) // 2))
+    queries = reference[order[:n_queries]]
+    reference = reference[order[n_queries:n_queries + sample_size]]
+    matrix, scales = quantize(reference, dtype)
+    k = min(k, len(reference))
+
+    hits = 0
+    for query in queries:
+        exact = np.argpartition(reference @ query, -k)[-k:]
+        approx = np.argpartition(dot_scores(matrix, scales, query), -k)[-k:]
+        hits += len(np.intersect1d(exact, approx))
+    return hits / (k * len(queries))
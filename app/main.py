@@ -1,22 +1,55 @@
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI
+import asyncio
 import logging
 from app.api import upload, generate, presentation_templates
-from app.core.embeddings import document_index
+from app.config import settings
+from app.core.embeddings import index_registry
+from app.core.ingest import shutdown_executor
 from app.core.llm_generator import content_generator
+from app.core.resources import governor
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+async def _evict_idle_indexes():
+    """Периодически выгружает индексы проектов, к которым давно не обращались"""
+    interval = max(10, index_registry.idle_seconds // 4)
+    while True:
+        await asyncio.sleep(interval)
+        evicted = index_registry.evict_idle()
+        if evicted:
+            logger.info(f"Выгружено простаивающих индексов: {evicted}")
+
+
+async def _resume_orphaned_jobs():
+    """При старте и затем периодически подхватывает задачи упавших воркеров"""
+    while True:
+        resumed = await asyncio.to_thread(generate.resume_orphaned_jobs)
+        if resumed:
+            logger.info(f"Возобновлено задач генерации: {resumed}")
+        await asyncio.sleep(settings.JOB_RESUME_INTERVAL_SECONDS)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     logger.info("🚀 AI Presentation Assistant starting up...")
     health = content_generator.health_check()
     logger.info(f"LLM Model status: {health}")
+    background = [
+        asyncio.create_task(_evict_idle_indexes()),
+        asyncio.create_task(_resume_orphaned_jobs())
+    ]
     yield
     # Shutdown
+    generate.shutdown_event.set()
+    for task in background:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    shutdown_executor()
     logger.info("🛑 AI Presentation Assistant shutting down...")
 
 
@@ -51,25 +84,18 @@ def health_check():
     """Проверка здоровья всех компонентов системы"""
     model_health = content_generator.health_check()
 
-    # Безопасная проверка document_index
+    # Безопасная проверка индексов проектов
     try:
-        documents_loaded = len(document_index.documents) > 0
-        documents_count = len(document_index.documents)
-        index_built = document_index.is_built
+        index_stats = index_registry.get_stats()
     except Exception as e:
         logger.error(f"Error checking document index: {e}")
-        documents_loaded = False
-        documents_count = 0
-        index_built = False
+        index_stats = {"loaded_projects": 0, "memory_bytes": 0}
 
     return {
         "status": "healthy" if model_health["status"] in ["healthy", "loaded"] else "degraded",
         "components": {
             "llm_model": model_health,
-            "document_index": {
-                "loaded": documents_loaded,
-                "documents_count": documents_count,
-                "index_built": index_built
-            }
+            "document_index": index_stats,
+            "resources": governor.stats()
         }
     }
\ No newline at end of file
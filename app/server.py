@@ -0,0 +1,122 @@
+"""Запуск сервиса: python -m app.server
+
+При WORKERS > 1 работает как pre-fork сервер: модели загружаются один раз в
+главном процессе, затем он форкает воркеров, которые делят веса через
+copy-on-write и слушают один общий сокет. ``uvicorn --workers`` так не умеет -
+он запускает воркеров через spawn, и каждый грузит свою копию моделей.
+Задачи и шаблоны лежат в SQLite, индекс документов - в mmap-файлах
+(см. ``app.core.storage`` и ``app.core.embeddings``), поэтому запрос может
+попасть на любой воркер.
+
+По SIGTERM задачи генерации останавливаются на границе слайда и отдают
+аренду - следующий запущенный воркер продолжит их с того же места.
+"""
+import gc
+import logging
+import os
+import signal
+import socket
+import time
+
+import uvicorn
+
+from app.config import settings
+from app.core.resources import worker_cores
+
+logger = logging.getLogger(__name__)
+
+
+class _Server(uvicorn.Server):
+    def handle_exit(self, sig, frame):
+        # uvicorn ждет фоновые задачи до lifespan shutdown - сигналим им сразу
+        from app.api.generate import shutdown_event
+        shutdown_event.set()
+        super().handle_exit(sig, frame)
+
+
+def _bind_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(app, sock: socket.socket):
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+    try:
+        import torch
+        torch.set_num_threads(worker_cores())
+    except ImportError:
+        pass
+
+    config = uvicorn.Config(app, log_level="info")
+    _Server(config).run(sockets=[sock])
+
+
+def _spawn(app, sock: socket.socket) -> int:
+    pid = os.fork()
+    if pid == 0:
+        try:
+            _run_worker(app, sock)
+        finally:
+            os._exit(0)
+    logger.info(f"Воркер запущен: pid {pid}")
+    return pid
+
+
+def serve_workers(workers: int):
+    # Импорт загружает LLM и эмбеддер - до fork, чтобы веса были общими
+    from app.main import app
+
+    sock = _bind_socket(settings.HOST, settings.PORT)
+    logger.info(f"Слушаем {settings.HOST}:{settings.PORT}, воркеров: {workers}")
+
+    # Объекты, созданные до fork, не трогаем сборщиком мусора - меньше копий страниц
+    gc.freeze()
+
+    children = {_spawn(app, sock) for _ in range(workers)}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+
+        children.discard(pid)
+        if not stopping:
+            logger.warning(f"Воркер {pid} завершился (статус {status}), перезапускаем")
+            time.sleep(1)
+            children.add(_spawn(app, sock))
+
+    sock.close()
+    logger.info("Все воркеры остановлены")
+
+
+def main():
+    if settings.WORKERS <= 1:
+        _Server(uvicorn.Config("app.main:app", host=settings.HOST, port=settings.PORT)).run()
+    else:
+        serve_workers(settings.WORKERS)
+
+
+if __name__ == "__main__":
+    main()
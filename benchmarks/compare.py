@@ -0,0 +1,60 @@
+"""Сравнение двух JSON-отчетов ``benchmarks.run`` по медиане.
+
+Пример:
+    python -m benchmarks.compare baseline.json current.json --threshold 0.1
+Код выхода 1, если хотя бы один бенчмарк замедлился сильнее порога.
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Tuple
+
+
+def _key(result: Dict[str, Any]) -> Tuple[str, str]:
+    return result["name"], json.dumps(result["params"], sort_keys=True)
+
+
+def load(path: str) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        report = json.load(f)
+    return {_key(r): r for r in report["results"]}
+
+
+def compare(baseline: str, current: str, threshold: float) -> List[Dict[str, Any]]:
+    old, new = load(baseline), load(current)
+    rows = []
+    for key in sorted(old.keys() & new.keys()):
+        before = old[key]["stats"]["median"]
+        after = new[key]["stats"]["median"]
+        change = (after - before) / before if before > 0 else 0.0
+        rows.append({
+            "name": key[0],
+            "params": new[key]["params"],
+            "baseline": before,
+            "current": after,
+            "change": change,
+            "regression": change > threshold,
+        })
+    return rows
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Сравнение результатов бенчмарков")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="Допустимое относительное замедление медианы")
+    args = parser.parse_args(argv)
+
+    rows = compare(args.baseline, args.current, args.threshold)
+    for row in rows:
+        mark = "REGRESSION" if row["regression"] else "ok"
+        print(f"{row['name']:<16} {json.dumps(row['params'], ensure_ascii=False):<32} "
+              f"{row['baseline'] * 1000:10.3f} ms -> {row['current'] * 1000:10.3f} ms "
+              f"({row['change']:+.1%}) {mark}")
+
+    sys.exit(1 if any(row["regression"] for row in rows) else 0)
+
+
+if __name__ == "__main__":
+    main()
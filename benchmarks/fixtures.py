@@ -0,0 +1,130 @@
+"""Генерация синтетических PDF/DOCX/XLSX/TXT файлов для бенчмарков парсинга."""
+import io
+import random
+from typing import List
+
+_WORDS_RU = (
+    "проект рынок выручка инвестиции команда продукт технология клиенты рост "
+    "прибыль затраты стратегия решение проблема аудитория тренды EBITDA CAPEX "
+    "платформа сервис масштабирование партнеры доля сегмент регион прогноз"
+).split()
+
+# Стандартные шрифты PDF не содержат кириллицы, поэтому PDF-фикстуры латинские
+_WORDS_EN = (
+    "project market revenue investment team product technology clients growth "
+    "profit costs strategy solution problem audience trends EBITDA CAPEX "
+    "platform service scaling partners share segment region forecast"
+).split()
+
+
+def make_paragraphs(n: int, words_per_paragraph: int = 60, seed: int = 0,
+                    vocabulary: List[str] = None) -> List[str]:
+    rng = random.Random(seed)
+    vocabulary = vocabulary or _WORDS_RU
+    return [
+        " ".join(rng.choice(vocabulary) for _ in range(words_per_paragraph)).capitalize() + "."
+        for _ in range(n)
+    ]
+
+
+def make_table(rows: int, cols: int, seed: int = 0) -> List[List[str]]:
+    rng = random.Random(seed)
+    header = ["Показатель"] + [str(2020 + i) for i in range(cols - 1)]
+    body = [
+        [rng.choice(_WORDS_RU)] + [str(rng.randint(100, 10000)) for _ in range(cols - 1)]
+        for _ in range(rows - 1)
+    ]
+    return [header] + body
+
+
+def make_txt(paragraphs: int = 50, seed: int = 0) -> bytes:
+    return "\n\n".join(make_paragraphs(paragraphs, seed=seed)).encode("utf-8")
+
+
+def make_docx(paragraphs: int = 50, tables: int = 2, seed: int = 0) -> bytes:
+    from docx import Document
+
+    doc = Document()
+    for text in make_paragraphs(paragraphs, seed=seed):
+        doc.add_paragraph(text)
+
+    for t in range(tables):
+        data = make_table(10, 5, seed=seed + t)
+        table = doc.add_table(rows=len(data), cols=len(data[0]))
+        for r, row in enumerate(data):
+            for c, value in enumerate(row):
+                table.cell(r, c).text = value
+
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def make_xlsx(sheets: int = 3, rows: int = 200, cols: int = 8, seed: int = 0) -> bytes:
+    import pandas as pd
+
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
+        for s in range(sheets):
+            data = make_table(rows, cols, seed=seed + s)
+            df = pd.DataFrame(data[1:], columns=data[0])
+            df.to_excel(writer, sheet_name=f"Лист{s + 1}", index=False)
+    return buffer.getvalue()
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(pages: int = 10, lines_per_page: int = 40, seed: int = 0) -> bytes:
+    """Минимальный валидный PDF с текстом на стандартном шрифте Helvetica."""
+    lines = make_paragraphs(pages * lines_per_page, words_per_paragraph=10, seed=seed,
+                            vocabulary=_WORDS_EN)
+
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # Pages - заполняется после страниц
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for p in range(pages):
+        page_lines = lines[p * lines_per_page:(p + 1) * lines_per_page]
+        stream = "BT /F1 10 Tf 50 800 Td 14 TL\n"
+        stream += "\n".join(f"({_pdf_escape(line)}) '" for line in page_lines)
+        stream += "\nET"
+        stream_bytes = stream.encode("latin-1")
+
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream_bytes) + stream_bytes + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+
+    kids = " ".join(f"{i} 0 R" for i in page_ids).encode("ascii")
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % pages
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n" % i + body + b"\nendobj\n")
+
+    xref_offset = out.tell()
+    out.write(b"xref\n0 %d\n" % (len(objects) + 1))
+    out.write(b"0000000000 65535 f \n")
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+              % (len(objects) + 1, xref_offset))
+    return out.getvalue()
+
+
+FIXTURE_BUILDERS = {
+    "txt": make_txt,
+    "docx": make_docx,
+    "pdf": make_pdf,
+    "xlsx": make_xlsx,
+}
@@ -0,0 +1,322 @@
+"""Нагрузочный тест ``app.main.app`` по HTTP с заглушками моделей.
+
+Поднимает uvicorn в отдельном потоке этого же процесса, чтобы измерять лаг
+event loop сервера и рост памяти, и запускает N виртуальных пользователей:
+загрузка файла -> запуск генерации -> опрос статуса -> скачивание.
+
+Пример:
+    python -m benchmarks.load_test --users 20 --duration 60 --output load.json
+    python -m benchmarks.load_test --users 50 --duration 1800 --llm-decode-ms 5  # soak
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import socket
+import sys
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from benchmarks.stubs import StubConfig, install_stubs, use_temp_data_dir
+from benchmarks import fixtures
+
+MIME_TYPES = {
+    "txt": "text/plain",
+    "pdf": "application/pdf",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = q * (len(ordered) - 1)
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # На не-Linux доступен только пиковый RSS
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return usage if sys.platform == "darwin" else usage * 1024
+
+
+@dataclass
+class Metrics:
+    latencies: Dict[str, List[float]] = field(default_factory=lambda: defaultdict(list))
+    errors: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    status_codes: Dict[str, Dict[int, int]] = field(default_factory=lambda: defaultdict(lambda: defaultdict(int)))
+    loop_lag: List[float] = field(default_factory=list)
+    memory: List[Dict[str, float]] = field(default_factory=list)
+    completed_jobs: int = 0
+    failed_jobs: int = 0
+
+    def record(self, endpoint: str, elapsed: float, status_code: Optional[int]):
+        self.latencies[endpoint].append(elapsed)
+        if status_code is None:
+            self.errors[endpoint] += 1
+            return
+        self.status_codes[endpoint][status_code] += 1
+        if status_code >= 400:
+            self.errors[endpoint] += 1
+
+    def summary(self) -> Dict[str, Any]:
+        endpoints = {}
+        for endpoint, values in sorted(self.latencies.items()):
+            endpoints[endpoint] = {
+                "requests": len(values),
+                "errors": self.errors[endpoint],
+                "error_rate": self.errors[endpoint] / len(values) if values else 0.0,
+                "status_codes": {str(k): v for k, v in sorted(self.status_codes[endpoint].items())},
+                "p50": percentile(values, 0.50),
+                "p95": percentile(values, 0.95),
+                "p99": percentile(values, 0.99),
+                "max": max(values) if values else 0.0,
+            }
+
+        memory = {}
+        if self.memory:
+            first, last = self.memory[0], self.memory[-1]
+            duration = max(last["t"] - first["t"], 1e-9)
+            memory = {
+                "rss_start_bytes": first["rss"],
+                "rss_end_bytes": last["rss"],
+                "rss_peak_bytes": max(m["rss"] for m in self.memory),
+                "rss_growth_bytes_per_min": (last["rss"] - first["rss"]) / duration * 60,
+                "jobs_stored_end": last["jobs"],
+                "samples": self.memory,
+            }
+
+        return {
+            "endpoints": endpoints,
+            "event_loop_lag": {
+                "samples": len(self.loop_lag),
+                "p50": percentile(self.loop_lag, 0.50),
+                "p95": percentile(self.loop_lag, 0.95),
+                "p99": percentile(self.loop_lag, 0.99),
+                "max": max(self.loop_lag) if self.loop_lag else 0.0,
+            },
+            "memory": memory,
+            "jobs": {"completed": self.completed_jobs, "failed": self.failed_jobs},
+        }
+
+
+class ServerThread:
+    """uvicorn в фоновом потоке со своим event loop и пробой лага."""
+
+    def __init__(self, app, metrics: Metrics, lag_interval: float = 0.05):
+        import uvicorn
+
+        self.port = self._free_port()
+        self.metrics = metrics
+        self.lag_interval = lag_interval
+        config = uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning")
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self._run, name="uvicorn", daemon=True)
+
+    @staticmethod
+    def _free_port() -> int:
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            return s.getsockname()[1]
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    async def _probe_lag(self):
+        while not self.server.should_exit:
+            start = time.perf_counter()
+            await asyncio.sleep(self.lag_interval)
+            self.metrics.loop_lag.append(max(0.0, time.perf_counter() - start - self.lag_interval))
+
+    def _run(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        loop.create_task(self._probe_lag())
+        loop.run_until_complete(self.server.serve())
+        loop.close()
+
+    def start(self, timeout: float = 30.0):
+        self.thread.start()
+        deadline = time.monotonic() + timeout
+        while not self.server.started:
+            if time.monotonic() > deadline or not self.thread.is_alive():
+                raise RuntimeError("Сервер не запустился")
+            time.sleep(0.05)
+
+    def stop(self):
+        self.server.should_exit = True
+        self.thread.join(timeout=30)
+
+
+class VirtualUser:
+    def __init__(self, client, metrics: Metrics, files: Dict[str, bytes], poll_interval: float,
+                 job_timeout: float, seed: int, project_id: str):
+        self.client = client
+        self.project_id = project_id
+        self.metrics = metrics
+        self.files = files
+        self.poll_interval = poll_interval
+        self.job_timeout = job_timeout
+        self.rng = random.Random(seed)
+
+    async def _request(self, endpoint: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except Exception:
+            self.metrics.record(endpoint, time.perf_counter() - start, None)
+            return None
+        self.metrics.record(endpoint, time.perf_counter() - start, response.status_code)
+        return response
+
+    async def run_once(self):
+        fmt = self.rng.choice(sorted(self.files))
+        files = {"file": (f"load.{fmt}", self.files[fmt], MIME_TYPES[fmt])}
+        await self._request("POST /upload/", "POST", "/upload/", files=files,
+                            params={"project_id": self.project_id})
+
+        response = await self._request("POST /generate/presentation", "POST",
+                                       "/generate/presentation", json={"project_id": self.project_id})
+        if response is None or response.status_code != 200:
+            return
+        job_id = response.json()["job_id"]
+
+        deadline = time.monotonic() + self.job_timeout
+        status = "pending"
+        while status in ("pending", "processing") and time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            response = await self._request("GET /generate/status/{job_id}", "GET",
+                                           f"/generate/status/{job_id}")
+            if response is not None and response.status_code == 200:
+                status = response.json()["status"]
+
+        if status == "completed":
+            self.metrics.completed_jobs += 1
+            await self._request("GET /generate/download/{job_id}", "GET",
+                                f"/generate/download/{job_id}")
+        else:
+            self.metrics.failed_jobs += 1
+
+    async def run(self, stop_at: float):
+        while time.monotonic() < stop_at:
+            await self.run_once()
+
+
+async def _sample_memory(metrics: Metrics, stop_at: float, interval: float):
+    from app.core.storage import job_store
+
+    started = time.monotonic()
+    while True:
+        metrics.memory.append({
+            "t": time.monotonic() - started,
+            "rss": _rss_bytes(),
+            "jobs": job_store.count(),
+        })
+        if time.monotonic() >= stop_at:
+            return
+        await asyncio.sleep(interval)
+
+
+async def drive(base_url: str, metrics: Metrics, users: int, projects: int, duration: float,
+                ramp_up: float, poll_interval: float, job_timeout: float, memory_interval: float):
+    import httpx
+
+    files = {fmt: builder() for fmt, builder in fixtures.FIXTURE_BUILDERS.items()}
+    stop_at = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=users * 2, max_keepalive_connections=users)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=job_timeout, limits=limits) as client:
+        async def start_user(i: int):
+            await asyncio.sleep(ramp_up * i / max(users, 1))
+            user = VirtualUser(client, metrics, files, poll_interval, job_timeout, seed=i,
+                               project_id=f"load-{i % max(projects, 1)}")
+            await user.run(stop_at)
+
+        await asyncio.gather(
+            _sample_memory(metrics, stop_at, memory_interval),
+            *(start_user(i) for i in range(users)),
+        )
+
+
+def run(users: int, projects: int, duration: float, ramp_up: float, poll_interval: float,
+        job_timeout: float, memory_interval: float, stub_config: StubConfig) -> Dict[str, Any]:
+    install_stubs(stub_config)
+    use_temp_data_dir()
+    from app.main import app
+
+    metrics = Metrics()
+    server = ServerThread(app, metrics)
+    server.start()
+    try:
+        asyncio.run(drive(server.base_url, metrics, users, projects, duration, ramp_up,
+                          poll_interval, job_timeout, memory_interval))
+    finally:
+        server.stop()
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "users": users,
+            "projects": projects,
+            "duration": duration,
+            "ramp_up": ramp_up,
+            "poll_interval": poll_interval,
+            "stubs": stub_config.to_dict(),
+        },
+        "results": metrics.summary(),
+    }
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Нагрузочный тест AI Presentation Assistant")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--projects", type=int, default=5,
+                        help="Число проектов, между которыми распределяются пользователи")
+    parser.add_argument("--duration", type=float, default=60.0, help="Длительность, секунды")
+    parser.add_argument("--ramp-up", type=float, default=5.0, help="Время разгона, секунды")
+    parser.add_argument("--poll-interval", type=float, default=0.5)
+    parser.add_argument("--job-timeout", type=float, default=300.0)
+    parser.add_argument("--memory-interval", type=float, default=5.0)
+    parser.add_argument("--output", help="Путь к JSON с результатами (по умолчанию stdout)")
+    parser.add_argument("--embedding-latency-ms", type=float, default=1.0)
+    parser.add_argument("--llm-prefill-ms", type=float, default=0.05)
+    parser.add_argument("--llm-decode-ms", type=float, default=2.0)
+    args = parser.parse_args(argv)
+
+    stub_config = StubConfig(
+        embedding_latency_ms_per_text=args.embedding_latency_ms,
+        llm_prefill_ms_per_token=args.llm_prefill_ms,
+        llm_decode_ms_per_token=args.llm_decode_ms,
+    )
+    report = run(args.users, args.projects, args.duration, args.ramp_up, args.poll_interval,
+                 args.job_timeout, args.memory_interval, stub_config)
+    payload = json.dumps(report, ensure_ascii=False, indent=2)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(payload)
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+"""Офлайн-бенчмарки горячих путей с детерминированными заглушками моделей.
+
+Пример:
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --suites index --index-sizes 1000,10000,100000,1000000
+    python -m benchmarks.compare old.json bench.json
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+from benchmarks.stubs import StubConfig, install_stubs, use_temp_data_dir
+from benchmarks import fixtures
+
+SUITES = ["ingest", "index", "storage", "generate", "pptx"]
+SEARCH_QUERIES = [
+    "название проект продукт",
+    "рынок объем аудитория тренды",
+    "финансы выручка инвестиции",
+    "команда опыт специалисты",
+]
+
+
+def measure(fn: Callable[[], Any], repeat: int = 5, warmup: int = 1) -> Dict[str, float]:
+    """Запускает ``fn`` и возвращает статистику времени выполнения в секундах."""
+    for _ in range(warmup):
+        fn()
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+
+    ordered = sorted(samples)
+    return {
+        "repeat": repeat,
+        "min": ordered[0],
+        "median": statistics.median(ordered),
+        "mean": statistics.fmean(ordered),
+        "p95": ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))],
+        "max": ordered[-1],
+        "stdev": statistics.stdev(ordered) if len(ordered) > 1 else 0.0,
+    }
+
+
+def _result(name: str, stats: Dict[str, float], **params) -> Dict[str, Any]:
+    return {"name": name, "params": params, "stats": stats}
+
+
+def bench_ingest(repeat: int) -> List[Dict[str, Any]]:
+    from fastapi import UploadFile
+    from app.core.parser import extract_text_from_file
+
+    results = []
+    for fmt, builder in fixtures.FIXTURE_BUILDERS.items():
+        data = builder()
+        filename = f"fixture.{fmt}"
+
+        def run():
+            upload = UploadFile(file=io.BytesIO(data), filename=filename)
+            asyncio.run(extract_text_from_file(upload))
+
+        results.append(_result(f"ingest.{fmt}", measure(run, repeat), bytes=len(data)))
+
+    results += bench_bulk_ingest(repeat)
+    return results
+
+
+def bench_bulk_ingest(repeat: int, files_per_format: int = 8) -> List[Dict[str, Any]]:
+    """Разбор пачки файлов: последовательно и через пул процессов пакетной загрузки."""
+    from app.core.ingest import parse_files, shutdown_executor
+    from app.core.parser import parse_document
+
+    files = [
+        (f"fixture_{i}.{fmt}", builder(seed=i))
+        for fmt, builder in fixtures.FIXTURE_BUILDERS.items()
+        for i in range(files_per_format)
+    ]
+
+    def run_sequential():
+        for name, content in files:
+            parse_document(name, content)
+
+    async def drain():
+        return [outcome async for outcome in parse_files(files)]
+
+    results = [_result("ingest.bulk_sequential", measure(run_sequential, repeat), files=len(files))]
+    # Прогрев поднимает процессы пула - в замер не входит
+    results.append(_result("ingest.bulk_parallel", measure(lambda: asyncio.run(drain()), repeat), files=len(files)))
+    shutdown_executor()
+    return results
+
+
+def bench_index(sizes: List[int], repeat: int) -> List[Dict[str, Any]]:
+    from app.core.embeddings import DocumentIndex
+
+    results = []
+    for size in sizes:
+        texts = fixtures.make_paragraphs(size, words_per_paragraph=20, seed=size)
+        documents = [
+            {"text": text, "metadata": {"filename": f"doc_{i}.txt"}}
+            for i, text in enumerate(texts)
+        ]
+
+        built = {}
+
+        def build():
+            # Индекс кодирует только новые документы, поэтому каждый прогон - с нуля
+            index = DocumentIndex()
+            index.add_documents(documents)
+            index.build_index()
+            built["index"] = index
+
+        # Построение на больших размерах дорогое - меряем один раз
+        build_repeat = 1 if size >= 100_000 else repeat
+        build_stats = measure(build, repeat=build_repeat, warmup=0)
+        results.append(_result("index.build", build_stats, vectors=size))
+        index = built["index"]
+
+        def run_search():
+            for query in SEARCH_QUERIES:
+                index.search(query, k=5)
+
+        search_stats = measure(run_search, repeat=repeat)
+        # Время на один запрос, а не на пачку
+        search_stats = {key: value if key == "repeat" else value / len(SEARCH_QUERIES)
+                        for key, value in search_stats.items()}
+        results.append(_result("index.search", search_stats, vectors=size, k=5))
+    return results
+
+
+def bench_storage(sizes: List[int], repeat: int) -> List[Dict[str, Any]]:
+    """Память, скорость dense-поиска и recall@10 для форматов хранения векторов."""
+    from app.core.embedding_backend import encode_texts
+    from app.core.embeddings import model
+    from app.core.vector_storage import STORAGE_DTYPES, dot_scores, quantize, recall_at_k
+
+    results = []
+    for size in sizes:
+        texts = fixtures.make_paragraphs(size, words_per_paragraph=20, seed=size)
+        reference = encode_texts(model, texts)
+        query = encode_texts(model, SEARCH_QUERIES[:1])[0]
+
+        for dtype in STORAGE_DTYPES:
+            matrix, scales = quantize(reference, dtype)
+            stats = measure(lambda: dot_scores(matrix, scales, query), repeat=repeat)
+            memory = matrix.nbytes + (scales.nbytes if scales is not None else 0)
+            results.append(_result(
+                "storage.search", stats, vectors=size, dtype=dtype,
+                memory_mb=round(memory / 1024 / 1024, 2),
+                recall_at_10=round(recall_at_k(reference, dtype), 4)
+            ))
+    return results
+
+
+def bench_generate(repeat: int) -> List[Dict[str, Any]]:
+    from app.api import generate
+    from app.core.embeddings import index_registry
+    from app.core.storage import job_store, worker_id
+
+    document_index = index_registry.get("bench")
+    texts = fixtures.make_paragraphs(200, seed=42)
+    document_index.add_documents([
+        {"text": text, "metadata": {"filename": f"doc_{i}.txt"}}
+        for i, text in enumerate(texts)
+    ])
+    document_index.build_index()
+
+    counter = iter(range(1_000_000))
+
+    def run():
+        job_id = f"bench-{next(counter)}"
+        job_store.create({"job_id": job_id, "status": "pending", "progress": 0,
+                          "worker_id": worker_id(), "lease_until": time.time() + 600})
+        generate._generate_presentation_task(job_id, generate.GenerationRequest(project_id="bench"))
+        status = job_store.get(job_id)
+        job_store.delete(job_id)
+        if status["status"] != "completed":
+            raise RuntimeError(f"Генерация не завершилась: {status.get('error_message')}")
+
+    return [_result("generate.task", measure(run, repeat), slides=len(generate._get_slides_structure()))]
+
+
+def bench_pptx(repeat: int) -> List[Dict[str, Any]]:
+    from app.api.generate import _get_slides_structure
+    from app.core.pptx_builder import PresentationBuilder
+
+    content = "\n".join(fixtures.make_paragraphs(4, words_per_paragraph=12))
+    results = []
+    for multiplier in (1, 10):
+        builder = PresentationBuilder()
+        for _ in range(multiplier):
+            for spec in _get_slides_structure():
+                builder.add_slide(spec["type"], spec["title"], content)
+
+        stats = measure(builder.save_to_bytes, repeat)
+        results.append(_result("pptx.save", stats, slides=builder.get_slide_count()))
+    return results
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+def run(suites: List[str], index_sizes: List[int], repeat: int, stub_config: StubConfig) -> Dict[str, Any]:
+    install_stubs(stub_config)
+    use_temp_data_dir()
+
+    results = []
+    if "ingest" in suites:
+        results += bench_ingest(repeat)
+    if "index" in suites:
+        results += bench_index(index_sizes, repeat)
+    if "storage" in suites:
+        results += bench_storage(index_sizes, repeat)
+    if "generate" in suites:
+        results += bench_generate(repeat)
+    if "pptx" in suites:
+        results += bench_pptx(repeat)
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "git_commit": _git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "suites": suites,
+            "stubs": stub_config.to_dict(),
+        },
+        "results": results,
+    }
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Офлайн-бенчмарки AI Presentation Assistant")
+    parser.add_argument("--suites", default=",".join(SUITES),
+                        help=f"Через запятую: {', '.join(SUITES)}")
+    parser.add_argument("--index-sizes", default="1000,10000,100000",
+                        help="Размеры индекса через запятую (до 1000000)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="Путь к JSON с результатами (по умолчанию stdout)")
+    parser.add_argument("--embedding-dim", type=int, default=384)
+    parser.add_argument("--embedding-latency-ms", type=float, default=0.0,
+                        help="Задержка заглушки эмбеддера на один текст")
+    parser.add_argument("--llm-prefill-ms", type=float, default=0.0,
+                        help="Задержка заглушки LLM на токен промпта")
+    parser.add_argument("--llm-decode-ms", type=float, default=0.0,
+                        help="Задержка заглушки LLM на сгенерированный токен")
+    args = parser.parse_args(argv)
+
+    suites = [s.strip() for s in args.suites.split(",") if s.strip()]
+    unknown = set(suites) - set(SUITES)
+    if unknown:
+        parser.error(f"Неизвестные наборы: {', '.join(sorted(unknown))}")
+
+    stub_config = StubConfig(
+        embedding_dim=args.embedding_dim,
+        embedding_latency_ms_per_text=args.embedding_latency_ms,
+        llm_prefill_ms_per_token=args.llm_prefill_ms,
+        llm_decode_ms_per_token=args.llm_decode_ms,
+    )
+    index_sizes = [int(s) for s in args.index_sizes.split(",") if s.strip()]
+
+    report = run(suites, index_sizes, args.repeat, stub_config)
+    payload = json.dumps(report, ensure_ascii=False, indent=2)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(payload)
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""Детерминированные заглушки моделей для офлайн-бенчмарков и нагрузочных тестов.
+
+Подменяют ``sentence_transformers`` и ``transformers`` в ``sys.modules``, поэтому
+``install_stubs()`` нужно вызывать ДО импорта модулей ``app.*``: эмбеддер и LLM
+создаются при импорте ``app.core.embeddings`` и ``app.core.llm_generator``.
+"""
+import os
+import sys
+import tempfile
+import time
+import types
+import zlib
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Union
+
+import numpy as np
+
+
+@dataclass
+class StubConfig:
+    embedding_dim: int = 384
+    embedding_latency_ms_per_text: float = 0.0
+    embedding_latency_ms_per_batch: float = 0.0
+    llm_prefill_ms_per_token: float = 0.0
+    llm_decode_ms_per_token: float = 0.0
+    llm_new_tokens: int = 60
+    vocab_size: int = 32000
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+_config = StubConfig()
+
+
+def _sleep_ms(ms: float):
+    if ms > 0:
+        time.sleep(ms / 1000.0)
+
+
+def _token_id(token: str, vocab_size: int) -> int:
+    return zlib.crc32(token.encode("utf-8")) % vocab_size
+
+
+class FakeSentenceTransformer:
+    """Эмбеддер с детерминированными векторами: сумма случайных векторов слов.
+
+    Тексты с общими словами получают близкие векторы, поэтому поиск ведет себя
+    правдоподобно, а результат не зависит от запуска.
+    """
+
+    def __init__(self, model_name_or_path: str = "", *args, **kwargs):
+        self.model_name = model_name_or_path
+        self.dim = _config.embedding_dim
+        self._token_vectors: Dict[int, np.ndarray] = {}
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    def _vector(self, token_id: int) -> np.ndarray:
+        vector = self._token_vectors.get(token_id)
+        if vector is None:
+            rng = np.random.default_rng(token_id)
+            vector = rng.standard_normal(self.dim).astype(np.float32)
+            self._token_vectors[token_id] = vector
+        return vector
+
+    def _embed(self, text: str) -> np.ndarray:
+        token_ids = [_token_id(t, _config.vocab_size) for t in text.lower().split()[:256]]
+        if not token_ids:
+            return np.zeros(self.dim, dtype=np.float32)
+        return np.sum([self._vector(t) for t in token_ids], axis=0)
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32,
+               convert_to_numpy: bool = True, normalize_embeddings: bool = False,
+               show_progress_bar: bool = False, **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+
+        n_batches = (len(texts) + batch_size - 1) // max(batch_size, 1)
+        _sleep_ms(n_batches * _config.embedding_latency_ms_per_batch
+                  + len(texts) * _config.embedding_latency_ms_per_text)
+
+        embeddings = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            embeddings[i] = self._embed(text)
+
+        if normalize_embeddings:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings = embeddings / np.maximum(norms, 1e-12)
+
+        return embeddings[0] if single else embeddings
+
+
+class FakeTokenizer:
+    """Пробельный токенизатор с интерфейсом, достаточным для кода приложения."""
+
+    eos_token = "</s>"
+    pad_token = "</s>"
+
+    def __init__(self):
+        self._vocab: Dict[int, str] = {}
+
+    @classmethod
+    def from_pretrained(cls, *args, **kwargs) -> "FakeTokenizer":
+        return cls()
+
+    def tokenize(self, text: str) -> List[str]:
+        return text.split()
+
+    def encode(self, text: str, add_special_tokens: bool = False, **kwargs) -> List[int]:
+        ids = []
+        for token in self.tokenize(text):
+            token_id = _token_id(token, _config.vocab_size)
+            self._vocab[token_id] = token
+            ids.append(token_id)
+        return ids
+
+    def decode(self, ids: List[int], skip_special_tokens: bool = True, **kwargs) -> str:
+        return " ".join(self._vocab.get(i, "<unk>") for i in ids)
+
+    def __call__(self, text: Union[str, List[str]], **kwargs) -> Dict[str, Any]:
+        if isinstance(text, str):
+            return {"input_ids": self.encode(text)}
+        return {"input_ids": [self.encode(t) for t in text]}
+
+
+class FakeCausalLM:
+    @classmethod
+    def from_pretrained(cls, *args, **kwargs) -> "FakeCausalLM":
+        return cls()
+
+
+_STUB_BULLETS = [
+    "• Рынок растет более чем на 20% в год",
+    "• Продукт сокращает затраты клиентов в два раза",
+    "• Команда имеет опыт запуска трех проектов",
+    "• Выручка выходит на окупаемость за 18 месяцев",
+]
+
+
+class FakeTextGenerationPipeline:
+    """Генератор с латентностью ``prefill * len(prompt) + decode * new_tokens``."""
+
+    def __init__(self, tokenizer: Any = None, **kwargs):
+        self.tokenizer = tokenizer or FakeTokenizer()
+        self.calls = 0
+
+    def __call__(self, prompt: str, **kwargs) -> List[Dict[str, str]]:
+        self.calls += 1
+        prompt_tokens = len(self.tokenizer.encode(prompt))
+        _sleep_ms(prompt_tokens * _config.llm_prefill_ms_per_token
+                  + _config.llm_new_tokens * _config.llm_decode_ms_per_token)
+
+        seed = zlib.crc32(prompt.encode("utf-8"))
+        bullets = [_STUB_BULLETS[(seed + i) % len(_STUB_BULLETS)] for i in range(3)]
+        return [{"generated_text": prompt + "\n" + "\n".join(bullets)}]
+
+
+def fake_pipeline(task: str = "text-generation", model: Any = None, tokenizer: Any = None,
+                  **kwargs) -> FakeTextGenerationPipeline:
+    return FakeTextGenerationPipeline(tokenizer=tokenizer, **kwargs)
+
+
+def configure(config: StubConfig):
+    """Меняет параметры заглушек; задержки применяются и к уже созданным объектам."""
+    global _config
+    _config = config
+
+
+def install_stubs(config: StubConfig = None):
+    """Регистрирует фейковые ``sentence_transformers`` и ``transformers``."""
+    if config is not None:
+        configure(config)
+
+    if any(name.startswith("app.core") for name in sys.modules):
+        raise RuntimeError("install_stubs() нужно вызывать до импорта app.core.*")
+
+    st_module = types.ModuleType("sentence_transformers")
+    st_module.SentenceTransformer = FakeSentenceTransformer
+    sys.modules["sentence_transformers"] = st_module
+
+    tf_module = types.ModuleType("transformers")
+    tf_module.AutoTokenizer = FakeTokenizer
+    tf_module.AutoModelForCausalLM = FakeCausalLM
+    tf_module.pipeline = fake_pipeline
+    sys.modules["transformers"] = tf_module
+
+
+def use_temp_data_dir() -> str:
+    """Направляет SQLite и файлы индекса во временный каталог, если DATA_DIR не задан."""
+    return os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="presentation-bench-"))
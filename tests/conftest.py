@@ -0,0 +1,5 @@
+from benchmarks.stubs import install_stubs, use_temp_data_dir
+
+# Заглушки моделей до импорта app.core.*: тесты не скачивают LLM и эмбеддер
+install_stubs()
+use_temp_data_dir()
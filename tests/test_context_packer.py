@@ -0,0 +1,72 @@
+from app.config import settings
+from app.core.chunking import overlap_tail, split_into_chunks
+from app.core.context_packer import ContextPacker
+from benchmarks.stubs import FakeTokenizer
+
+
+def _packer(budget: int = 1000) -> ContextPacker:
+    return ContextPacker(FakeTokenizer(), budgets={}, default_budget=budget)
+
+
+def _document_chunks(source: str = "plan.pdf") -> list:
+    paragraphs = [
+        " ".join(f"абзац{p} слово{w}" for w in range(40)) for p in range(6)
+    ]
+    chunks = split_into_chunks("\n".join(paragraphs), settings.CHUNK_CHARS, settings.CHUNK_OVERLAP_CHARS)
+    assert len(chunks) >= 3
+    return [
+        {"content": text, "source": source, "chunk_id": i, "score": 1.0 - i * 0.1}
+        for i, text in enumerate(chunks)
+    ]
+
+
+def test_overlap_removed_once_between_consecutive_chunks():
+    chunks = _document_chunks()[:2]
+    context = _packer().pack(chunks, "finance")
+
+    first, second = context.split("\n---\n")
+    tail = overlap_tail(chunks[0]["content"], settings.CHUNK_OVERLAP_CHARS)
+    assert tail and chunks[1]["content"].startswith(f"{tail} ")
+    assert first == chunks[0]["content"]
+    assert second == chunks[1]["content"][len(tail) + 1:]
+    assert context.count("абзац0 слово39") == 1
+
+
+def test_overlap_removed_when_next_chunk_ranks_higher():
+    chunks = _document_chunks()[:2]
+    chunks[1]["score"] = 2.0
+    context = _packer().pack(chunks, "finance")
+
+    first, second = context.split("\n---\n")
+    assert first == chunks[1]["content"]
+    assert chunks[0]["content"].startswith(second)
+    assert context.count("абзац0 слово39") == 1
+
+
+def test_matching_text_of_non_neighbour_chunks_is_kept():
+    left = {"content": "Выручка компании в 2024 году", "source": "a.pdf", "chunk_id": 0, "score": 0.9}
+    right = {"content": "утроилась благодаря выходу на новые рынки", "source": "b.pdf", "chunk_id": 1, "score": 0.8}
+    context = _packer().pack([left, right], "finance")
+
+    assert context == f"{left['content']}\n---\n{right['content']}"
+
+
+def test_overlap_kept_for_chunks_that_are_not_consecutive():
+    chunks = _document_chunks()
+    far = dict(chunks[2], chunk_id=5)
+    other_source = dict(chunks[1], source="other.pdf")
+
+    context = _packer().pack([chunks[0], far], "finance")
+    assert context.split("\n---\n")[1] == far["content"]
+
+    context = _packer().pack([chunks[0], other_source], "finance")
+    assert context.split("\n---\n")[1] == other_source["content"]
+
+
+def test_facts_pinned_first_and_budget_respected():
+    packer = _packer(budget=120)
+    facts = ["Выручка: 2024 - 120; +20% к 2023"]
+    context = packer.pack(_document_chunks(), "finance", facts=facts)
+
+    assert context.startswith("Показатели из таблиц:\n- Выручка")
+    assert packer.count_tokens(context) <= 120
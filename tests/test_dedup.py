@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+
+from app.config import settings
+from app.core.dedup import LSHIndex, MinHasher, is_empty
+from app.core.embeddings import DocumentIndex
+
+_WORDS = ("выручка рынок команда проект продажи клиенты доставка склад маршрут сервис "
+          "рост план затраты инвестиции прибыль доля регион партнер город заказ").split()
+
+
+def _text(seed: int, length: int = 80) -> str:
+    rng = np.random.default_rng(seed)
+    return " ".join(rng.choice(_WORDS, size=length))
+
+
+def _edited(text: str, *positions: int) -> str:
+    """Тот же текст со словами на ``positions``, замененными на новые."""
+    words = text.split()
+    return " ".join(f"правка{i}" if i in positions else word for i, word in enumerate(words))
+
+
+def _shingle_jaccard(left: str, right: str, size: int) -> float:
+    def shingles(text):
+        words = text.split()
+        return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+    a, b = shingles(left), shingles(right)
+    return len(a & b) / len(a | b)
+
+
+def test_signatures_are_stable_and_estimate_jaccard():
+    hasher = MinHasher(num_perm=256, shingle_size=5)
+    original = _text(1)
+    edited = _edited(original, 0, 20, 40, 60)
+
+    signatures = hasher.signatures([original, edited, original, ""])
+    # Подписи хранятся с индексом: тот же текст дает ту же подпись в любом процессе
+    assert (signatures[0] == MinHasher(num_perm=256, shingle_size=5).signatures([original])[0]).all()
+    assert (signatures[0] == signatures[2]).all()
+    assert is_empty(signatures[3]) and not is_empty(signatures[0])
+
+    estimate = (signatures[0] == signatures[1]).mean()
+    assert estimate == pytest.approx(_shingle_jaccard(original, edited, 5), abs=0.1)
+
+
+def _lsh_pair(equal_positions: int, threshold: float = 0.75):
+    """Подпись и ее копия, совпадающая ровно в первых ``equal_positions`` позициях из 64."""
+    base = np.random.default_rng(0).integers(0, 1 << 31, size=64, dtype=np.uint32)
+    other = base.copy()
+    other[equal_positions:] += 1
+    return LSHIndex(64, 16, threshold, signatures=base[None, :]), other[None, :]
+
+
+def test_lsh_threshold_boundary():
+    # 48 из 64 позиций - оценка Жаккара ровно 0.75
+    lsh, signature = _lsh_pair(48)
+    assert lsh.query_many(signature, lsh.band_hashes(signature)) == [0]
+
+    # На одну позицию меньше: общие полосы есть, но порог не пройден
+    lsh, signature = _lsh_pair(47)
+    assert lsh.query_many(signature, lsh.band_hashes(signature)) == [None]
+
+
+def test_lsh_group_collapses_within_batch_and_respects_exclude():
+    base = np.random.default_rng(0).integers(0, 1 << 31, size=(3, 64), dtype=np.uint32)
+    signatures = np.stack([base[0], base[0], base[1], base[0]])
+    lsh = LSHIndex(64, 16, 0.75)
+    hashes = lsh.band_hashes(signatures)
+
+    assert lsh.group(signatures, hashes) == [None, 0, None, 0]
+    assert lsh.group(signatures, hashes, exclude=np.array([True, False, False, False])) == [None, None, None, 1]
+
+
+def test_lsh_rejects_bands_that_do_not_divide_signature():
+    with pytest.raises(ValueError):
+        LSHIndex(64, 10, 0.8)
+
+
+def _add(index: DocumentIndex, documents: dict):
+    index.add_documents([{"text": text, "metadata": {"filename": name}} for name, text in documents.items()])
+    index.build_index()
+
+
+def _sources(index_dir) -> dict:
+    return {doc["source"]: doc["sources"] for doc in DocumentIndex(str(index_dir)).documents}
+
+
+def test_near_duplicates_collapse_in_batch_and_against_committed(tmp_path):
+    index_dir = tmp_path / "index"
+    index = DocumentIndex(str(index_dir))
+    memo = _text(1)
+    assert _shingle_jaccard(memo, _edited(memo, 40), settings.DEDUP_SHINGLE_SIZE) > settings.DEDUP_THRESHOLD
+    _add(index, {"memo_v1.txt": memo, "memo_v2.txt": _edited(memo, 40), "team.txt": _text(2)})
+
+    # Вторая версия записки свернута в первую, ее файл - в списке источников
+    assert _sources(index_dir) == {"memo_v1.txt": ["memo_v1.txt", "memo_v2.txt"], "team.txt": ["team.txt"]}
+
+    # Следующая загрузка: копия уже записанного фрагмента не добавляет вектор
+    _add(index, {"memo_v3.txt": _edited(memo, 60)})
+    assert _sources(index_dir) == {
+        "memo_v1.txt": ["memo_v1.txt", "memo_v2.txt", "memo_v3.txt"],
+        "team.txt": ["team.txt"]
+    }
+    assert len(DocumentIndex(str(index_dir)).embeddings) == 2
+
+
+def test_texts_below_threshold_are_kept(tmp_path):
+    index_dir = tmp_path / "index"
+    memo = _text(1)
+    rewritten = _edited(memo, 0, 20, 40, 60)
+    # Четыре правки на 80 слов: Жаккар около 0.65, ниже порога, но полосы LSH совпадают
+    assert _shingle_jaccard(memo, rewritten, settings.DEDUP_SHINGLE_SIZE) < settings.DEDUP_THRESHOLD
+
+    _add(DocumentIndex(str(index_dir)), {"memo.txt": memo, "rewritten.txt": rewritten})
+    assert _sources(index_dir) == {"memo.txt": ["memo.txt"], "rewritten.txt": ["rewritten.txt"]}
@@ -0,0 +1,64 @@
+import threading
+
+from app.core import embeddings
+from app.core.embeddings import DocumentIndex
+
+
+def _document(filename: str) -> dict:
+    return {"text": f"Текст документа {filename}. " * 20, "metadata": {"filename": filename}}
+
+
+def test_documents_added_during_build_are_not_lost(tmp_path, monkeypatch):
+    index = DocumentIndex(str(tmp_path / "index"))
+    index.add_documents([_document("a.txt")])
+
+    encode_texts = embeddings.encode_texts
+    encoding = threading.Event()
+    added = threading.Event()
+
+    def slow_encode(model, texts, workload=None):
+        encoding.set()
+        added.wait(5)
+        return encode_texts(model, texts, workload)
+
+    monkeypatch.setattr(embeddings, "encode_texts", slow_encode)
+    build = threading.Thread(target=index.build_index)
+    build.start()
+    assert encoding.wait(5)
+    # Вторая загрузка того же проекта, пока первая сборка кодирует
+    index.add_documents([_document("b.txt")])
+    added.set()
+    build.join()
+
+    assert index.has_pending()
+    index.build_index()
+
+    assert not index.has_pending()
+    assert {doc["source"] for doc in DocumentIndex(str(tmp_path / "index")).documents} == {"a.txt", "b.txt"}
+
+
+def test_registry_stats_do_not_list_projects(tmp_path):
+    from app.core.embeddings import IndexRegistry
+
+    registry = IndexRegistry(tmp_path / "indexes", memory_budget_bytes=1 << 30, idle_seconds=60)
+    registry.get("client_a").add_documents([_document("a.txt")])
+    registry.get("client_b")
+
+    stats = registry.get_stats()
+    assert stats["loaded_projects"] == 2
+    assert "client_a" not in repr(stats) and "client_b" not in repr(stats)
+
+
+def test_registry_exists_does_not_create_projects(tmp_path):
+    from app.core.embeddings import IndexRegistry
+
+    registry = IndexRegistry(tmp_path / "indexes", memory_budget_bytes=1 << 30, idle_seconds=60)
+    assert not registry.exists("random_id")
+    assert not (tmp_path / "indexes" / "random_id").exists()
+
+    index = registry.get("client_a")
+    assert registry.exists("client_a")
+    index.add_documents([_document("a.txt")])
+    index.build_index()
+    # Выгруженный индекс проекта по-прежнему существует на диске
+    assert IndexRegistry(tmp_path / "indexes", 1 << 30, 60).exists("client_a")
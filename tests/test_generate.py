@@ -0,0 +1,113 @@
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import generate
+from app.config import settings
+from app.core.embeddings import IndexRegistry
+from app.core.pptx_builder import PresentationBuilder
+from app.core.storage import JobStore, worker_id
+
+
+def _client() -> TestClient:
+    app = FastAPI()
+    app.include_router(generate.router, prefix="/generate")
+    return TestClient(app)
+
+
+def test_lease_is_renewed_while_a_slide_is_generated(tmp_path, monkeypatch):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    monkeypatch.setattr(generate, "job_store", store)
+    monkeypatch.setattr(settings, "JOB_LEASE_SECONDS", 0.3)
+    store.create({"job_id": "j", "status": "processing", "progress": 0,
+                  "worker_id": worker_id(), "lease_until": time.time() + 0.3})
+
+    # Один долгий слайд: без фонового продления аренда истекла бы посреди него
+    with generate._lease_heartbeat("j") as lost:
+        time.sleep(0.8)
+        assert store.get("j")["lease_until"] > time.time()
+        assert store.orphaned() == []
+    assert not lost.is_set()
+
+    store.update("j", worker_id="other-host:1:x")
+    with generate._lease_heartbeat("j") as lost:
+        assert lost.wait(1.0)
+
+
+def test_generation_for_unknown_project_does_not_create_it(tmp_path, monkeypatch):
+    registry = IndexRegistry(tmp_path / "indexes", memory_budget_bytes=1 << 30, idle_seconds=60)
+    monkeypatch.setattr(generate, "index_registry", registry)
+
+    response = _client().post("/generate/presentation", json={"project_id": "random_id"})
+    assert response.status_code == 404
+    assert not (tmp_path / "indexes" / "random_id").exists()
+    assert registry.get_stats()["loaded_projects"] == 0
+
+    response = _client().post("/generate/presentation", json={"project_id": "../etc"})
+    assert response.status_code == 400
+
+
+def _slide_texts(data: bytes) -> list:
+    builder = PresentationBuilder.from_bytes(data)
+    return [
+        "\n".join(shape.text_frame.text for shape in slide.shapes if shape.has_text_frame)
+        for slide in builder.prs.slides
+    ]
+
+
+def _completed_job(store: JobStore):
+    slides = [
+        {"slide_type": slide_type, "title": title, "content": f"Текст слайда {i}",
+         "context": f"Контекст {i}", "status": "success"}
+        for i, (slide_type, title) in enumerate([("title", "Проект"), ("finance", "Финансы"), ("team", "Команда")])
+    ]
+    builder = PresentationBuilder()
+    for slide in slides:
+        builder.add_slide(slide["slide_type"], slide["title"], slide["content"])
+    store.create({"job_id": "j", "status": "completed", "progress": 100, "slides_generated": slides,
+                  "presentation_data": builder.save_to_bytes().getvalue(), "request": {"audience": "инвесторы"}})
+
+
+def test_regenerate_slide_changes_only_that_slide(tmp_path, monkeypatch):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    monkeypatch.setattr(generate, "job_store", store)
+    _completed_job(store)
+    before = store.get("j", with_data=True)
+
+    calls = []
+
+    def generate_slide_content(slide_type, context, audience):
+        calls.append((slide_type, context, audience))
+        return {"content": "Новый текст о финансах"}
+
+    monkeypatch.setattr(generate.content_generator, "generate_slide_content", generate_slide_content)
+
+    response = _client().post("/generate/presentation/j/slides/1", json={"audience": "эксперты"})
+    assert response.status_code == 200
+    assert response.json()["content"] == "Новый текст о финансах"
+    # Сохраненный контекст переиспользуется без поиска
+    assert calls == [("finance", "Контекст 1", "эксперты")]
+
+    after = store.get("j", with_data=True)
+    old_texts, new_texts = _slide_texts(before["presentation_data"]), _slide_texts(after["presentation_data"])
+    assert len(new_texts) == 3
+    assert new_texts[0] == old_texts[0] and new_texts[2] == old_texts[2]
+    assert "Новый текст о финансах" in new_texts[1] and "Текст слайда 1" not in new_texts[1]
+
+    assert after["slides_generated"][1]["content"] == "Новый текст о финансах"
+    assert after["slides_generated"][0] == before["slides_generated"][0]
+    assert after["slides_generated"][2] == before["slides_generated"][2]
+
+
+def test_regenerate_slide_out_of_range_is_not_found(tmp_path, monkeypatch):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    monkeypatch.setattr(generate, "job_store", store)
+    _completed_job(store)
+    before = store.get("j", with_data=True)
+
+    assert _client().post("/generate/presentation/j/slides/3").status_code == 404
+    assert _client().post("/generate/presentation/j/slides/-1").status_code == 404
+    assert _client().post("/generate/presentation/missing/slides/0").status_code == 404
+    assert not store.replace_slide("j", 3, {}, lambda data: data)
+    assert store.get("j", with_data=True) == before
@@ -0,0 +1,115 @@
+from collections import Counter
+
+import pytest
+
+from app.core.embeddings import DocumentIndex
+from app.core.lexical import InvertedIndex, stem_ru, tokenize
+
+
+# Эталонные основы - вывод русского стеммера Snowball
+@pytest.mark.parametrize("word, stem", [
+    ("выручка", "выручк"),
+    ("выручкой", "выручк"),
+    ("инвестиций", "инвестиц"),
+    ("инвестиционных", "инвестицион"),
+    ("рентабельности", "рентабельн"),
+    ("затратами", "затрат"),
+    ("увеличившись", "увелич"),
+    ("крупнейший", "крупн"),
+])
+def test_stem_matches_snowball(word, stem):
+    assert stem_ru(word) == stem
+
+
+def test_tokenize_keeps_numbers_percents_and_latin_terms():
+    assert tokenize("Выручка выросла на 15% до 1,5 млрд, EBITDA за 2024 год и CAPEX") == [
+        "выручк", "выросл", "15%", "1,5", "млрд", "ebitda", "2024", "год", "capex"
+    ]
+
+
+def test_tokenize_folds_yo_and_drops_stopwords():
+    assert tokenize("И ещё объём рынка") == [stem_ru("объем"), "рынк"]
+
+
+def _inverted(texts) -> InvertedIndex:
+    index = InvertedIndex()
+    for text in texts:
+        index.add(Counter(tokenize(text)))
+    return index
+
+
+def test_bm25_matches_other_word_forms_and_only_posted_documents():
+    index = _inverted([
+        "Выручка компании выросла",
+        "Команда проекта и ее опыт",
+        "Рост выручки за три года, выручкой доволен акционер",
+        "Рынок и конкуренты",
+    ])
+
+    hits = index.search("выручке", limit=10)
+    assert [doc_id for doc_id, _ in hits] == [2, 0]
+    assert hits[0][1] > hits[1][1] > 0
+    assert index.search("логистика", limit=10) == []
+
+
+def test_bm25_rarer_term_weighs_more_and_limit_is_applied():
+    index = _inverted(["рынок выручка"] + ["рынок план"] * 5 + ["выручка план"])
+
+    hits = dict(index.search("рынок выручка", limit=10))
+    assert hits[0] == max(hits.values())
+    assert hits[6] > hits[1]
+    assert len(index.search("рынок", limit=3)) == 3
+
+
+def test_inverted_index_round_trip():
+    index = _inverted(["Выручка 2024", "EBITDA и CAPEX"])
+    restored = InvertedIndex.from_dict(index.to_dict())
+    assert restored.search("ebitda capex", 5) == index.search("ebitda capex", 5)
+
+
+def _project(tmp_path) -> DocumentIndex:
+    index = DocumentIndex(str(tmp_path / "index"))
+    texts = {
+        "finance.txt": "Выручка компании за 2024 год составила 1,5 млрд рублей.",
+        "team.txt": "Команда проекта: основатели с опытом в логистике.",
+        "market.txt": "Объем рынка доставки оценивается в 300 млрд рублей.",
+        "plan.txt": "План продаж предполагает рост выручки вдвое.",
+    }
+    index.add_documents([{"text": text, "metadata": {"filename": name}} for name, text in texts.items()])
+    index.build_index()
+    return index
+
+
+def test_hybrid_search_rescores_only_lexical_candidates(tmp_path, monkeypatch):
+    index = _project(tmp_path)
+    dense_scores = index._dense_scores
+    scored = []
+
+    def recording_dense_scores(query_embedding, ids=None):
+        scored.append(None if ids is None else sorted(ids.tolist()))
+        return dense_scores(query_embedding, ids)
+
+    monkeypatch.setattr(index, "_dense_scores", recording_dense_scores)
+
+    hits = index.search_chunks("выручкой", k=4)
+    candidates = sorted(doc_id for doc_id, _ in index.lexical.search("выручкой", 10))
+    # Плотная близость считается только для кандидатов BM25, а не по всему индексу
+    assert scored == [candidates]
+    assert len(candidates) == 2
+    assert {hit["source"] for hit in hits} == {"finance.txt", "plan.txt"}
+
+
+def test_hybrid_search_falls_back_to_dense_without_lexical_hits(tmp_path, monkeypatch):
+    index = _project(tmp_path)
+    dense_scores = index._dense_scores
+    scored = []
+
+    def recording_dense_scores(query_embedding, ids=None):
+        scored.append(ids)
+        return dense_scores(query_embedding, ids)
+
+    monkeypatch.setattr(index, "_dense_scores", recording_dense_scores)
+
+    hits = index.search_chunks("logistics", k=2)
+    assert scored == [None]
+    assert len(hits) == 2
@@ -0,0 +1,132 @@
+import asyncio
+import threading
+import time
+
+from app.core.resources import ResourceGovernor
+
+
+class _YieldingLock:
+    """Блокировка, которая после освобождения отдает процессор - расширяет окно гонки."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        self._lock.acquire()
+
+    def __exit__(self, *exc):
+        self._lock.release()
+        time.sleep(0.001)
+
+
+def _start_together(governor: ResourceGovernor, names) -> dict:
+    start = threading.Barrier(len(names))
+    inside = threading.Barrier(len(names))
+    threads = {}
+
+    def run(name):
+        start.wait()
+        with governor.workload(name) as workload:
+            threads[name] = workload.threads
+            inside.wait()
+
+    workers = [threading.Thread(target=run, args=(name,)) for name in names]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return threads
+
+
+def test_workloads_started_together_do_not_both_take_all_cores():
+    governor = ResourceGovernor(cores=8)
+    governor._lock = _YieldingLock()
+    for _ in range(20):
+        threads = _start_together(governor, ("llm", "embedding"))
+        # Кто-то из двух стартовал вторым и должен получить свой бюджет
+        assert min(threads.values()) < 8
+
+
+def test_thread_counts_follow_neighbours_between_batches():
+    governor = ResourceGovernor(cores=8)
+    with governor.workload("embedding") as embedding:
+        assert embedding.threads == 8
+        with governor.workload("llm") as llm:
+            assert llm.threads == governor.budgets["llm"]
+            # Генерация началась посреди загрузки - следующий батч уступает ей ядра
+            assert governor.retune(embedding) == 8 - llm.threads
+        assert governor.retune(embedding) == 8
+
+    with governor.workload("llm") as llm:
+        assert llm.threads == 8
+        with governor.workload("embedding") as embedding:
+            # Генерация стартовала одна и держит все ядра
+            assert embedding.threads == 1
+    assert governor.stats()["held_threads"] == {"llm": 0, "embedding": 0, "parse": 0}
+
+
+def test_concurrent_generations_share_the_cores():
+    governor = ResourceGovernor(cores=8)
+    with governor.workload("llm") as first, governor.workload("llm") as second:
+        assert first.threads == 8
+        assert second.threads == 4
+
+
+def test_parsing_holds_pool_processes_not_cores():
+    governor = ResourceGovernor(cores=8)
+    with governor.workload("parse") as parse:
+        assert parse.threads == 1
+        with governor.workload("embedding") as embedding:
+            assert embedding.threads == governor.budgets["embedding"]
+
+
+def test_async_workloads_of_one_class_on_one_thread():
+    governor = ResourceGovernor(cores=8)
+
+    async def parse(delay):
+        with governor.workload("parse"):
+            await asyncio.sleep(delay)
+
+    async def main():
+        await asyncio.gather(parse(0.02), parse(0.01), parse(0.03))
+
+    asyncio.run(main())
+    stats = governor.stats()
+    assert stats["active"]["parse"] == 0 and stats["held_threads"]["parse"] == 0
+    assert stats["completed"]["parse"] == 3
+
+
+def test_encode_texts_retunes_every_batch(monkeypatch):
+    import numpy as np
+    from app.core import embedding_backend
+
+    governor = ResourceGovernor(cores=8)
+    monkeypatch.setattr(embedding_backend, "governor", governor)
+    monkeypatch.setattr(embedding_backend.settings, "EMBEDDING_MAX_BATCH_SIZE", 1)
+    generation_started, generation_done = threading.Event(), threading.Event()
+
+    def generate():
+        with governor.workload("llm"):
+            generation_started.set()
+            generation_done.wait(5)
+
+    class Model:
+        max_seq_length = 16
+        seen = []
+
+        def get_sentence_embedding_dimension(self):
+            return 4
+
+        def encode(self, texts, **kwargs):
+            self.seen.append(governor.stats()["last_threads"]["embedding"])
+            if len(self.seen) == 1:
+                threading.Thread(target=generate).start()
+                generation_started.wait(5)
+            return np.ones((len(texts), 4), dtype=np.float32)
+
+    model = Model()
+    with governor.workload("embedding") as workload:
+        embedding_backend.encode_texts(model, ["a", "b", "c"], workload)
+    generation_done.set()
+
+    assert model.seen == [8, 2, 2]
@@ -0,0 +1,67 @@
+import time
+
+from app.core.storage import JobStore, worker_id
+
+
+def _store(tmp_path) -> JobStore:
+    return JobStore(str(tmp_path / "jobs.db"))
+
+
+def test_writes_of_a_worker_that_lost_the_job_are_rejected(tmp_path):
+    store = _store(tmp_path)
+    store.create({"job_id": "j", "status": "processing", "progress": 0,
+                  "worker_id": worker_id(), "lease_until": time.time() + 60})
+    assert store.append_slide("j", {"title": "1"})
+
+    # Аренда истекла, и задачу забрал другой воркер
+    store.update("j", worker_id="other-host:1")
+    assert not store.append_slide("j", {"title": "2"})
+    assert not store.update_owned("j", status="completed")
+
+    job = store.get("j")
+    assert [slide["title"] for slide in job["slides_generated"]] == ["1"]
+    assert job["status"] == "processing"
+
+
+def test_released_job_is_claimed_without_spending_an_attempt(tmp_path):
+    store = _store(tmp_path)
+    store.create({"job_id": "j", "status": "processing", "progress": 0,
+                  "worker_id": worker_id(), "lease_until": time.time() + 60})
+
+    # Плавные перезапуски: воркер отдает задачу, следующий ее забирает
+    for _ in range(5):
+        store.release_lease("j")
+        [job] = store.orphaned()
+        assert not store.interrupted(job)
+        assert store.claim(job)
+    assert store.get("j")["attempts"] == 0
+
+    # Аренда истекла без отдачи - это прерванная попытка
+    store.update("j", lease_until=time.time() - 1)
+    [job] = store.orphaned()
+    assert store.interrupted(job)
+    assert store.claim(job)
+    assert store.get("j")["attempts"] == 1
+
+
+def test_job_of_a_previous_run_with_the_same_pid_is_orphaned(tmp_path):
+    store = _store(tmp_path)
+    host, pid, _ = worker_id().split(":")
+    # Перезапущенный контейнер: тот же хост и pid, аренда прошлого запуска еще не истекла
+    store.create({"job_id": "j", "status": "processing", "progress": 0,
+                  "worker_id": f"{host}:{pid}:previous-run", "lease_until": time.time() + 60})
+    store.create({"job_id": "mine", "status": "processing", "progress": 0,
+                  "worker_id": worker_id(), "lease_until": time.time() + 60})
+
+    assert [job["job_id"] for job in store.orphaned()] == ["j"]
+
+
+def test_renewal_after_release_does_not_take_the_job_back(tmp_path):
+    store = _store(tmp_path)
+    store.create({"job_id": "j", "status": "processing", "progress": 0,
+                  "worker_id": worker_id(), "lease_until": time.time() + 60})
+    assert store.renew_lease("j")
+
+    store.release_lease("j")
+    assert not store.renew_lease("j")
+    assert [job["job_id"] for job in store.orphaned()] == ["j"]
@@ -0,0 +1,88 @@
+import pytest
+
+from app.core.table_facts import detect_metric, extract_series, parse_number
+
+
+@pytest.mark.parametrize("label, metric", [
+    ("Выручка", "revenue"),
+    ("Выручка от продаж, млн руб.", "revenue"),
+    ("Доходы от реализации", "revenue"),
+    ("Оборот", "revenue"),
+    ("Revenue", "revenue"),
+    ("Себестоимость продаж", "opex"),
+    ("Расходы на продажи", "opex"),
+    ("Операционные расходы", "opex"),
+    ("Прибыль (убыток) от продаж", "operating_profit"),
+    ("Валовая прибыль", "gross_profit"),
+    ("EBITDA, млн руб.", "ebitda"),
+    ("Рентабельность EBITDA", "margin"),
+    ("Чистая прибыль (убыток)", "net_income"),
+    ("Капитальные затраты", "capex"),
+    ("CAPEX", "capex"),
+    ("Инвестиции", "investment"),
+    ("Объем рынка, млрд руб.", "market_size"),
+    ("Доля рынка", "market_share"),
+    ("Клиенты", "customers"),
+    ("Оборотные активы", None),
+    ("Доходность, %", None),
+    ("Прочие доходы", None),
+    ("Сотрудники", None),
+])
+def test_detect_metric(label, metric):
+    assert detect_metric(label) == metric
+
+
+@pytest.mark.parametrize("cell, expected", [
+    ("1 200", (1200.0, False)),
+    ("1 560,5", (1560.5, False)),
+    ("1,234,567.5", (1234567.5, False)),
+    ("(50)", (-50.0, False)),
+    ("−3,2", (-3.2, False)),
+    ("12,5 %", (12.5, True)),
+    ("3.4 млн руб.", (3.4, False)),
+    (42, (42.0, False)),
+    (float("nan"), None),
+    ("", None),
+    ("н/д", None),
+    (None, None),
+])
+def test_parse_number(cell, expected):
+    assert parse_number(cell) == expected
+
+
+def test_extract_series_years_in_header():
+    table = [
+        ["Показатель", "2021", "2022", "2023", "2024П"],
+        ["Выручка, млн руб.", "1 000", "1 200", "", "1 440"],
+        ["Рентабельность EBITDA", "10%", "12%", "15%", "16,5%"],
+        ["Сотрудники", "10", "20", "30", "40"],
+    ]
+    revenue, margin = extract_series(table, "plan.docx")
+
+    assert revenue["metric"] == "revenue"
+    assert revenue["years"] == [2021, 2022, 2024]
+    assert revenue["values"] == [1000.0, 1200.0, 1440.0]
+    assert revenue["yoy"] == pytest.approx(0.2)
+    assert revenue["cagr"] == pytest.approx(1.44 ** (1 / 3) - 1)
+    assert revenue["total"] == 3640.0
+
+    assert margin["metric"] == "margin" and margin["percent"]
+    assert margin["yoy"] == pytest.approx(1.5)
+    assert margin["cagr"] is None and margin["total"] is None
+
+
+def test_extract_series_years_in_column():
+    sheet = {
+        "sheet_name": "Рынок",
+        "columns": ["Год", "Объем рынка, млрд руб.", "Клиенты", "Комментарий"],
+        "data": [[2022, 100.0, 1000, "база"], [2023, 130.0, 1800, ""], [2024, 169.0, 2500, ""]],
+    }
+    series = {item["metric"]: item for item in extract_series(sheet, "market.xlsx")}
+
+    assert set(series) == {"market_size", "customers"}
+    market = series["market_size"]
+    assert market["table"] == "Рынок" and market["source"] == "market.xlsx"
+    assert market["values"] == [100.0, 130.0, 169.0]
+    assert market["cagr"] == pytest.approx(0.3)
+    # Объем рынка - показатель на дату, а не поток: сумма по годам не имеет смысла
+    assert market["total"] is None
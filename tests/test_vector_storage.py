@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from app.core.vector_storage import STORAGE_DTYPES, dequantize, dot_scores, quantize, recall_at_k
+
+
+def _normalized(rows: int, dim: int, seed: int = 0, spread: float = None) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(rows, dim))
+    if spread is not None:
+        # Плотный кластер вокруг одного направления: соседи различаются в мелких деталях
+        vectors = rng.normal(size=(1, dim)) + spread * vectors
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+@pytest.mark.parametrize("dtype, tolerance", [("float32", 0.0), ("float16", 1e-3), ("int8", 1e-2)])
+def test_quantize_round_trip(dtype, tolerance):
+    embeddings = _normalized(50, 64)
+    matrix, scales = quantize(embeddings, dtype)
+
+    assert matrix.dtype == np.dtype(dtype)
+    assert (scales is not None) == (dtype == "int8")
+    assert np.abs(dequantize(matrix, scales) - embeddings).max() <= tolerance
+
+
+@pytest.mark.parametrize("dtype", STORAGE_DTYPES)
+def test_dot_scores_match_dequantized_matrix(dtype):
+    embeddings = _normalized(50, 64)
+    query = _normalized(1, 64, seed=1)[0]
+    matrix, scales = quantize(embeddings, dtype)
+
+    scores = dot_scores(matrix, scales, query)
+    assert scores.dtype == np.float32
+    np.testing.assert_allclose(scores, dequantize(matrix, scales) @ query, atol=1e-5)
+    np.testing.assert_allclose(scores, embeddings @ query, atol=0.02)
+
+
+def test_quantize_rejects_unknown_dtype():
+    with pytest.raises(ValueError):
+        quantize(_normalized(2, 8), "bfloat16")
+
+
+def test_recall_does_not_count_query_finding_itself():
+    cluster = _normalized(500, 64, spread=0.1)
+
+    assert recall_at_k(cluster, "float32", k=1) == 1.0
+    # Запрос из самой выборки всегда нашел бы себя первым и дал бы recall@1 = 1.0
+    assert recall_at_k(cluster, "int8", k=1) < 0.9
+    assert recall_at_k(_normalized(2000, 384), "int8") > 0.9